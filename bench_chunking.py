@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""下载读取方式基准测试：固定 16 KiB iter_content 与自适应块 + 复用缓冲区
+
+服务器运行在独立进程中，统计的 CPU 时间只包含下载端。
+用法: python bench_chunking.py [文件大小 MiB] [重复次数]
+"""
+
+import http.server
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from sym_ops import Downloader
+
+PORT = 18731
+
+
+def serve(size: int, port: int):
+    block = os.urandom(1024 * 1024)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            remaining = size
+            while remaining:
+                n = min(remaining, len(block))
+                self.wfile.write(block[:n])
+                remaining -= n
+
+    http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+def measure(downloader: Downloader, url: str, target: str) -> tuple:
+    cpu, wall = time.process_time(), time.perf_counter()
+    code = downloader.download(url, target, {})
+    assert code == 0, f"下载失败: {code}"
+    return time.process_time() - cpu, time.perf_counter() - wall
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    size = size_mb * 1024 * 1024
+    server = multiprocessing.Process(target=serve, args=(size, PORT), daemon=True)
+    server.start()
+    time.sleep(0.5)
+
+    logger = logging.getLogger("bench")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    url = f"http://127.0.0.1:{PORT}/file.bin"
+
+    print("=" * 60)
+    print(f"下载 {size_mb} MiB，每种方式重复 {repeat} 次")
+    print("=" * 60)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, "file.bin")
+            for name, adaptive in (("iter_content 16 KiB", False), ("自适应块 + readinto", True)):
+                downloader = Downloader(logger, adaptive_chunks=adaptive)
+                measure(downloader, url, target)  # 预热连接
+                results = [measure(downloader, url, target) for _ in range(repeat)]
+                cpu = min(i[0] for i in results)
+                wall = min(i[1] for i in results)
+                print(f"{name:24} CPU {cpu * 1000 / size_mb:7.3f} ms/MiB   "
+                      f"墙钟 {wall * 1000 / size_mb:7.3f} ms/MiB   "
+                      f"{size_mb / wall:8.1f} MiB/s")
+                downloader.close()
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
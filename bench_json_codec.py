@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""JSON 编解码基准测试：标准库与 JsonCodec（orjson / ijson 流式解析）
+
+使用合成的版本配置文件（update-14pp 中有 N 个版本，只有最新的几个比本地版本新）。
+用法: python bench_json_codec.py [条目数] [重复次数]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sym_utils import JsonCodec, orjson, ijson
+
+NEWER = 3
+
+
+def version(i: int) -> str:
+    return f"v{i // 10000}.{i // 100 % 100}.{i % 100}"
+
+
+def make_manifest(n: int) -> dict:
+    return {
+        "update-14pp": {
+            version(i): {
+                "url-win": f"https://example.com/releases/{version(i)}/symbiosis.exe",
+                "url-con": f"https://example.com/releases/{version(i)}/symbiosis-con.exe",
+                "sha256-win": f"{i:064x}",
+                "sha256-con": f"{i * 7:064x}",
+                "enable-config-update": i % 2 == 0,
+                "notes": ["修复若干问题", f"build {i}"]
+            } for i in range(n)
+        },
+        "userdata": {"channel": [0, 1]}
+    }
+
+
+def best(fx, repeat: int) -> float:
+    results = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fx()
+        results.append(time.perf_counter() - started)
+    return min(results)
+
+
+def peak_memory(fx) -> int:
+    tracemalloc.start()
+    try:
+        fx()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    manifest = make_manifest(entries)
+    local = entries - NEWER - 1
+    newer = lambda k: tuple(map(int, k[1:].split("."))) > (local // 10000, local // 100 % 100, local % 100)
+
+    print("=" * 60)
+    print(f"{entries} 个条目，{NEWER} 个新版本，每项重复 {repeat} 次取最短")
+    print(f"orjson: {'已安装' if orjson else '未安装'}   ijson: "
+          f"{ijson.backend if ijson else '未安装'}")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = os.path.join(tmp, "version.json")
+        with open(fp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(manifest, indent=4))
+        print(f"文件大小 {os.path.getsize(fp) / 1024 / 1024:.2f} MiB")
+
+        def stdlib_filter():
+            with open(fp, "r", encoding="utf-8") as f:
+                data = json.loads(f.read())
+            return {k: v for k, v in data["update-14pp"].items() if newer(k)}
+
+        expected = stdlib_filter()
+        assert len(expected) == NEWER
+        cases = [("json.loads + 过滤", stdlib_filter)]
+        codecs = [JsonCodec("json", None)] + ([JsonCodec("orjson", None)] if orjson else [])
+        for codec in codecs:
+            cases.append((f"{codec.backend} 完整解析 + 过滤",
+                          lambda c=codec: c.load_items(fp, "update-14pp", newer)))
+        if ijson:
+            codec = JsonCodec(stream_threshold=0)
+            cases.append(("ijson 流式解析",
+                          lambda c=codec: c.load_items(fp, "update-14pp", newer)))
+
+        print("\n读取新版本条目")
+        for name, fx in cases:
+            assert fx() == expected, name
+            print(f"  {name:24} {best(fx, repeat) * 1000:9.2f} ms   "
+                  f"峰值内存 {peak_memory(fx) / 1024 / 1024:7.2f} MiB")
+
+        print("\n序列化")
+        for codec in codecs:
+            for indent in (None, 2, 4):
+                assert json.loads(codec.dumps(manifest, indent)) == manifest
+                elapsed = best(lambda: codec.dumps(manifest, indent), repeat)
+                print(f"  {codec.backend:8} indent={str(indent):5}   {elapsed * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
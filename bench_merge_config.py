@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""配置合并基准测试：原 merge_config（递归、逐层复制）与 merge_layers（显式栈、写时复制）
+
+合成宽而深的配置，以及若干只修改少量子树的补丁层，比较依次合并所有补丁的耗时。
+原实现会修改输入中的嵌套字典，因此每次运行前都重新复制输入（不计入耗时）。
+用法: python bench_merge_config.py [补丁层数] [重复次数]
+"""
+
+import copy
+import json
+import random
+import sys
+import time
+from collections.abc import Mapping
+
+from sym_utils import merge_layers
+
+
+def legacy_merge_config(conf1, conf2, ip=False):
+    """原 sym_utils.merge_config"""
+    res = conf1.copy()
+    for k, v in conf2.items():
+        if k in res.keys() and isinstance(v, Mapping):
+            res[k].update(legacy_merge_config(res[k], v))
+        else:
+            res.update({k: v})
+    if ip:
+        conf1.clear()
+        conf1.update(res)
+    return res
+
+
+def make_tree(width: int, depth: int, prefix: str = "") -> dict:
+    if depth == 0:
+        return {f"{prefix}k{i}": i for i in range(width)}
+    return {f"{prefix}n{i}": make_tree(width, depth - 1, f"{prefix}{i}.") for i in range(width)}
+
+
+def make_patch(tree: dict, rng: random.Random, touches: int) -> dict:
+    """随机修改 tree 中的 touches 个叶子（偶尔新增键），返回只包含修改部分的补丁"""
+    patch = {}
+    for _ in range(touches):
+        node, target = tree, patch
+        while True:
+            key = rng.choice(list(node))
+            if not isinstance(node[key], dict):
+                target[key if rng.random() > 0.1 else key + "_new"] = rng.random()
+                break
+            node = node[key]
+            target = target.setdefault(key, {})
+    return patch
+
+
+def legacy_fold(layers: list) -> dict:
+    # 与 update_single_file_api 中原来的写法相同
+    tmp = layers[0]
+    for i in layers:
+        legacy_merge_config(tmp, i, ip=True)
+    return tmp
+
+
+def pairwise_fold(layers: list) -> dict:
+    tmp = layers[0]
+    for i in layers[1:]:
+        tmp = merge_layers(tmp, i)
+    return tmp
+
+
+def measure(fx, make_input, repeat: int) -> float:
+    results = []
+    for _ in range(repeat):
+        args = make_input()
+        started = time.perf_counter()
+        fx(args)
+        results.append(time.perf_counter() - started)
+    return min(results)
+
+
+def main():
+    layers_n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(0)
+    shapes = [("宽 (200 x 200)", 200, 1), ("深 (8^5)", 8, 4), ("宽且深 (30^3)", 30, 2)]
+
+    print("=" * 60)
+    print(f"{layers_n} 个补丁层，每项重复 {repeat} 次取最短")
+    print("=" * 60)
+    for name, width, depth in shapes:
+        base = make_tree(width, depth)
+        patches = [make_patch(base, rng, 50) for _ in range(layers_n)]
+        layers = [base] + patches
+
+        expected = legacy_fold(copy.deepcopy(layers))
+        snapshot = copy.deepcopy(layers)
+        # 比较序列化结果，键的顺序也需要一致
+        expected = json.dumps(expected)
+        assert json.dumps(merge_layers(*layers)) == expected, name
+        assert json.dumps(pairwise_fold(layers)) == expected, name
+        assert layers == snapshot, "merge_layers 修改了输入"
+
+        legacy = measure(legacy_fold, lambda: copy.deepcopy(layers), repeat)
+        folded = measure(lambda args: merge_layers(*args), lambda: layers, repeat)
+        pairwise = measure(pairwise_fold, lambda: layers, repeat)
+        print(f"{name}")
+        print(f"  merge_config 逐层合并       {legacy * 1000:9.2f} ms")
+        print(f"  merge_layers 逐层合并       {pairwise * 1000:9.2f} ms")
+        print(f"  merge_layers 一次合并所有层 {folded * 1000:9.2f} ms   ({legacy / folded:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@
 import argparse
 from collections import defaultdict
 import colorlog
-import json
 import logging
 import logging.handlers
 import os
@@ -10,11 +9,15 @@ import sys
 import time
 import warnings
 
+from functools import wraps
 from traceback import format_exc
 from typing import Callable
+from urllib.parse import urlsplit
 
 from constants import *
-from sym_ops import add_startup_task, check_time, decode_datetime, Executor, Downloader, FileDeleter
+from sym_ops import add_startup_task, check_time, decode_datetime, Executor, Downloader, FileDeleter, EntryFilter, HttpCache, ContentStore, MetricsHub
+from sym_ops import CircuitBreaker, RetryPolicy, RetryScheduler, TaskRunner, default_backend
+from sym_ops import BUDGET_EXCEEDED, DEFERRED, DRY_RUN, Deadline, StateStore
 from sym_utils import *
 from update_utils import *
 from update_action import parse_update_action
@@ -80,9 +83,36 @@ def check_time_can_do(config: defaultdict):
     )
 
 
+def task_deadline(config) -> Deadline:
+    """任务的截止时间：time_budget 与整个运行的 run_deadline 中较早的一个"""
+    return Deadline(config_reader.get(config, "time_budget", 0)).earliest(run_deadline)
+
+
+def budget_status(status_code):
+    """因 run_deadline 到期而中止的任务改为推迟到下次运行（TTL 不变）"""
+    if status_code == BUDGET_EXCEEDED and run_deadline.expired():
+        return DEFERRED
+    return status_code
+
+
+def deferrable(fx: Callable) -> Callable:
+    """run_deadline 的剩余时间不足以运行该任务（time_budget）时，推迟到下次运行"""
+    @wraps(fx)
+    def wrapper(id_, config):
+        if not run_deadline.fits(config_reader.get(config, "time_budget", 0)):
+            logger.warning(f"剩余运行时间不足，{id_} 推迟到下次运行")
+            return DEFERRED
+        return fx(id_, config)
+    return wrapper
+
+
+@deferrable
 def run(id_, config: defaultdict):
     """执行程序操作"""
     logger.info(f"运行 {id_=}")
+    if args.dry_run:
+        logger.info(f"[dry run] 跳过执行 {id_}")
+        return DRY_RUN
     time_ch = check_time_can_do(config)
 
     if not time_ch[1]:
@@ -96,25 +126,35 @@ def run(id_, config: defaultdict):
         "uac_admin": False,
         "use_psexec": False,
         "workdir": os.getcwd(),
-        "disable": False
+        "disable": False,
+        "wait": False,
+        "timeout": None
     })
 
-    exit_code = executor.execute(
+    deadline = task_deadline(config)
+    timeout = deadline.clip(params["timeout"])
+    result = executor.execute(
         exec_fp=params["exec"],
         parameters=params["parameters"],
         uac_admin=params["uac_admin"],
         use_psexec=params["use_psexec"],
         workdir=params["workdir"],
-        disable=params["disable"]
+        disable=params["disable"],
+        wait=params["wait"],
+        timeout=timeout
     )
-    if exit_code > 32:  # windll.ShellExecuteW 若执行成功则返回大于 32 的值
-        return 0
-    else:
-        return exit_code
+    if result.timed_out and timeout != params["timeout"]:
+        # 超时由 time_budget 或 run_deadline 引起
+        return budget_status(BUDGET_EXCEEDED)
+    return result.status
 
 
+@deferrable
 def download(id_, config):
     """下载文件，支持重试机制"""
+    if args.dry_run:
+        logger.info(f"[dry run] 跳过下载 {id_}")
+        return DRY_RUN
     # 使用统一配置读取器获取参数
     params = config_reader.get_multi(config, {
         "url": None,
@@ -124,7 +164,14 @@ def download(id_, config):
         "checksum": {},
         "ignore_status": False,
         "safe_write": True,
-        "timestamp": False
+        "timestamp": False,
+        "segments": 1,
+        "cache": False,
+        "cache_context": "",
+        "bandwidth": 0,
+        "retry_base_delay": 1.0,
+        "retry_max_delay": 60.0,
+        "retry_jitter": True
     })
 
     url = params["url"]
@@ -147,19 +194,26 @@ def download(id_, config):
     if params["timestamp"]:
         filepath = combine_timestamp_fp(filepath)
 
-    # 重试逻辑
-    status = 1
-    for attempt in range(retry):
-        status = downloader.download(
-            url, filepath, headers, checksum, ignore_status, safe_write)
-        if status == 0 or not can_retry(status):
-            break
-        logger.warning(
-            f"Download failed, still trying... ({attempt + 1}/{retry})")
+    deadline = task_deadline(config)
 
-    return status
+    def attempt_download(attempt):
+        status = downloader.download(
+            url, filepath, headers, checksum, ignore_status, safe_write,
+            params["segments"], params["cache"], params["cache_context"],
+            params["bandwidth"], attempt, deadline)
+        return status, downloader.last_metrics.retry_after
+
+    # 重试逻辑：指数退避 + 抖动，遵守 Retry-After，按主机熔断
+    policy = RetryPolicy(
+        base_delay=params["retry_base_delay"],
+        max_delay=params["retry_max_delay"],
+        jitter=params["retry_jitter"]
+    )
+    return budget_status(retry_scheduler.run(
+        attempt_download, retry, policy, urlsplit(url).netloc.lower(), deadline))
 
 
+@deferrable
 def deleteFile(id_, config):
     """删除文件/目录"""
     logger.debug(f"删除文件 {id_}")
@@ -173,16 +227,42 @@ def deleteFile(id_, config):
     params = config_reader.get_multi(config, {
         "src": None,
         "folders": True,
-        "only_subfolders": False
+        "only_subfolders": False,
+        "workers": 1,
+        "dry_run": False,
+        "include": None,
+        "exclude": None,
+        "min_age": None,
+        "max_age": None,
+        "min_size": None,
+        "max_size": None
     })
 
     fp = params["src"]
     del_folder = params["folders"]
     only_subfolder = params["only_subfolders"]
+    entry_filter = EntryFilter(
+        include=params["include"], exclude=params["exclude"],
+        min_age=params["min_age"], max_age=params["max_age"],
+        min_size=params["min_size"], max_size=params["max_size"])
+
+    if params["dry_run"] or args.dry_run:
+        plan = file_deleter.plan(
+            file_path=fp, del_folders=del_folder,
+            only_subfolders=only_subfolder, workers=params["workers"],
+            entry_filter=entry_filter)
+        logger.info(
+            f"[dry run] {id_}: 将删除 {plan['files']} 个文件，{plan['dirs']} 个文件夹，"
+            f"共 {plan['size']} 字节，预计耗时 {plan['estimated_time']:.1f}s"
+            + (f"，{plan['unreadable']} 个文件夹无法读取" if plan["unreadable"] else ""))
+        for path, size in plan["largest"]:
+            logger.info(f"[dry run]     {size:>14} 字节  {path}")
+        return DRY_RUN
 
     exit_code = file_deleter.delete(
         file_path=fp, del_folders=del_folder,
-        only_subfolders=only_subfolder)
+        only_subfolders=only_subfolder, workers=params["workers"],
+        entry_filter=entry_filter)
     if any(exit_code.values()):
         return 0
     else:
@@ -217,9 +297,7 @@ def update_single_file_api(config: dict, local_make_time, save_path, channel, up
             if not uptodate:
                 logger.info(f"available for update (local version: {local_make_time}, remote version: {upgrade_content[0][0]}). "
                             f"Current database is {len(upgrade_content)} versions behind.")
-                tmp = upgrade_content[-1][1]
-                for i in (j[1] for j in upgrade_content[::-1]):
-                    merge_config(tmp, i, ip=True)
+                tmp = merge_layers(*(j[1] for j in upgrade_content[::-1]))
             else:
                 logger.info(f"检查到多个文件的累积更新：{', '.join([i[0] for i in upgrade_content])}。"
                             f"将自动为您更新到最新的一个版本 {upgrade_content[0][0]}")
@@ -235,8 +313,9 @@ def update_single_file_api(config: dict, local_make_time, save_path, channel, up
         if os.path.exists(save_path):
             os.rename(save_path, old_file_fp)
 
+        # 文本模式写入，换行符与平台一致
         with open(save_path, "w", encoding="utf-8") as f:
-            f.write(json.dumps(tmp, indent=4))
+            f.write(json_codec.dumps(tmp, indent=4).decode("utf-8"))
         logger.info("complete.")
     else:
         logger.info("没有更新可用")
@@ -248,11 +327,22 @@ def update_single_file(id_, dl_config: dict, local_make_time, save_path, channel
     ex_code = download(id_, dl_config)
     logger.debug(f"{dl_config=}, {save_path=}")
 
-    if ex_code == 0:
-        with open(dl_config.get("filepath"), "rb") as f:
-            tmp = json.loads(f.read())
-        update_single_file_api(tmp, local_make_time,
-                               save_path, channel, uptodate)
+    if ex_code == 138:
+        logger.info(f"{id_} 的远程文件未变化，跳过更新")
+        return 0
+    elif ex_code == 0:
+        try:
+            # 只构造比本地版本新的补丁
+            local_version = decode_config_time_version(local_make_time)
+            tmp = json_codec.load_items(
+                dl_config.get("filepath"),
+                predicate=lambda k: decode_config_time_version(k) > local_version)
+            update_single_file_api(tmp, local_make_time,
+                                   save_path, channel, uptodate)
+        except Exception:
+            # 处理失败时丢弃缓存，保证下次启动重新下载
+            http_cache.invalidate(dl_config.get("url"))
+            raise
         logger.debug(f"delete: {dl_config.get('filepath')}")
         os.unlink(dl_config.get("filepath"))
         return ex_code
@@ -261,45 +351,20 @@ def update_single_file(id_, dl_config: dict, local_make_time, save_path, channel
         return 134
 
 
-def get_update():
-    """获取和应用更新"""
-    upgrade_config = fr_json.get("upgrade", {})
-    if not upgrade_config:
-        logger.error(f"无法更新，因为 upgrade 键值对没有任何内容 [Error {131}]")
-        return 131
-
-    local_make_time = fr_json.get("make-time", 0)
-    retry = upgrade_config.get("retry", globalsettings.get("retry", 1))
-    upgrade_json_fp = get_exec() + ".upgrade"
+def update_main_program(upgrade_config, upgrade_json_fp, retry, downgrade_config, downgrade_sign):
+    """根据版本配置文件更新主程序"""
     upgrade_execute_fp = get_exec() + ".tmp"
     upgrade_old_execute_fp = get_exec() + ".orig"
 
-    if retry == 0:
-        logger.info("Self-upgrade is disabled.")
-        return 128
-
-    # 处理降级配置
-    downgrade_config = upgrade_config.get(
-        "downgrade", DEFAULT_DOWNGRADE_CONFIG)
-    downgrade_sign = downgrade_config.get("downgrade", None)
-
-    # 下载版本配置文件
-    logger.debug("Downloading version of configure file. . .")
-    exit_code = download("get-update", {
-        "url": upgrade_config["json-url"],
-        "filepath": upgrade_json_fp,
-        "retry": retry,
-        "timestamp": False
-    })
-
-    if exit_code != 0:
-        logger.error(
-            f"Cannot download version of configure file (Error {exit_code})")
-        return exit_code
-
     logger.debug("Resolving configure file. . .")
-    with open(upgrade_json_fp, "r", encoding="utf-8") as f:
-        head_json = json.loads(f.read())
+    if downgrade_sign is not None:
+        versions = json_codec.load(upgrade_json_fp)["update-14pp"]
+    else:
+        # 只构造比当前版本新的条目
+        exclude = upgrade_config.get("specific_version_exclude", [])
+        versions = json_codec.load_items(
+            upgrade_json_fp, "update-14pp",
+            lambda k: version_entity < Version(k) and k not in exclude)
     os.unlink(upgrade_json_fp)
 
     # 确定 URL 和哈希键
@@ -311,13 +376,13 @@ def get_update():
     # 处理强制降级更新
     if downgrade_sign is not None:
         logger.info(f"发现无视版本的强制更新标志，准备更新至 {downgrade_sign}")
-        if downgrade_sign in head_json["update-14pp"].keys():
+        if downgrade_sign in versions.keys():
             download("downgrade", {
-                "url": head_json["update-14pp"][downgrade_sign][up_url_key],
+                "url": versions[downgrade_sign][up_url_key],
                 "filepath": upgrade_execute_fp,
                 "retry": retry,
                 "timestamp": False,
-                "checksum": {"sha256": head_json["update-14pp"][downgrade_sign][up_hash_key]}
+                "checksum": {"sha256": versions[downgrade_sign][up_hash_key]}
             })
             if not downgrade_config.get("permanent", False):
                 logger.debug("已清除一次性更新标志")
@@ -328,14 +393,11 @@ def get_update():
             fr_json["upgrade"].update({"downgrade": downgrade_config})
         else:
             logger.error(
-                f"强制更新标志应该是 {', '.join(head_json['update-14pp'].keys())} 之一")
+                f"强制更新标志应该是 {', '.join(versions.keys())} 之一")
             return 130
     else:
         # 检查常规更新
-        upgrade_content = [
-            [k, v] for k, v in head_json["update-14pp"].items()
-            if version_entity < Version(k) and k not in upgrade_config.get("specific_version_exclude", [])
-        ]
+        upgrade_content = [[k, v] for k, v in versions.items()]
         upgrade_content.sort(key=lambda x: decode_version(x[0]), reverse=True)
 
         if upgrade_content:
@@ -359,6 +421,9 @@ def get_update():
                     os.unlink(upgrade_old_execute_fp)
                 os.rename(get_exec(), upgrade_old_execute_fp)
                 os.rename(upgrade_execute_fp, get_exec())
+            else:
+                # 主程序没有更新成功，下次启动时需要重新检查版本配置文件
+                http_cache.invalidate(upgrade_config["json-url"])
 
             tmp = upgrade_content[0][1].get("enable-config-update", None)
             if tmp is not None:
@@ -366,6 +431,59 @@ def get_update():
         else:
             logger.info(f"主程序暂无更新")
 
+    return 0
+
+
+def get_update():
+    """获取和应用更新"""
+    upgrade_config = fr_json.get("upgrade", {})
+    if not upgrade_config:
+        logger.error(f"无法更新，因为 upgrade 键值对没有任何内容 [Error {131}]")
+        return 131
+
+    local_make_time = fr_json.get("make-time", 0)
+    retry = upgrade_config.get("retry", globalsettings.get("retry", 1))
+    upgrade_json_fp = get_exec() + ".upgrade"
+
+    if retry == 0:
+        logger.info("Self-upgrade is disabled.")
+        return 128
+
+    # 处理降级配置
+    downgrade_config = upgrade_config.get(
+        "downgrade", DEFAULT_DOWNGRADE_CONFIG)
+    downgrade_sign = downgrade_config.get("downgrade", None)
+
+    # 下载版本配置文件
+    # 强制降级需要每次都执行，不使用缓存
+    logger.debug("Downloading version of configure file. . .")
+    exit_code = download("get-update", {
+        "url": upgrade_config["json-url"],
+        "filepath": upgrade_json_fp,
+        "retry": retry,
+        "timestamp": False,
+        "cache": downgrade_sign is None,
+        "cache_context": f"{__version__}|{upgrade_config.get('console', False)}|"
+                         f"{','.join(upgrade_config.get('specific_version_exclude', []))}"
+    })
+
+    if exit_code == 138:
+        logger.info("版本配置文件未变化，跳过主程序更新检查")
+        exit_code = 0
+    elif exit_code != 0:
+        logger.error(
+            f"Cannot download version of configure file (Error {exit_code})")
+        return exit_code
+    else:
+        try:
+            exit_code = update_main_program(
+                upgrade_config, upgrade_json_fp, retry, downgrade_config, downgrade_sign)
+        except Exception:
+            http_cache.invalidate(upgrade_config["json-url"])
+            raise
+        if exit_code != 0:
+            return exit_code
+
     # 更新配置文件
     if upgrade_config.get("enable-config-update", True):
         if "config-url" in fr_json["upgrade"].keys():
@@ -387,7 +505,9 @@ def get_update():
         update_single_file("patchFile.up", {
             "url": fr_json["upgrade"]["patch-url"],
             "filepath": resource_path(args.patchFile + ".upgrade"),
-            "retry": retry
+            "retry": retry,
+            "cache": True,
+            "cache_context": f"{local_make_time}|{fr_json['userdata'].get('channel', 0)}"
         }, local_make_time, get_resource(args.patchFile),
             fr_json["userdata"].get("channel", 0),
             uptodate=False)
@@ -421,6 +541,9 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("configFile", nargs="?", default="config.json")
     parser.add_argument("patchFile", nargs="?", default="config.temp.json")
     parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    # 重置 TTL 剩余次数："类型:id" 或 id（所有类型中的该 id），不带参数时重置所有任务
+    parser.add_argument("--reset-ttl", nargs="*", metavar="ID")
     args, unknown = parser.parse_known_args()
 
     if args.debug:
@@ -436,36 +559,6 @@ def parse_args() -> argparse.Namespace:
     return args
 
 
-def get_config(conf_fp, patch_fp):
-    """获取合并后的配置"""
-    config = {}
-    tmp = {"ignore_case": False}
-
-    if not os.path.exists(patch_fp):
-        logger.error(f"{patch_fp} 不存在，你可以将其视为空值，该文件在后续将自动创建。")
-    else:
-        with open(patch_fp, "r", encoding="utf-8") as f:
-            tmp.update(json.loads(f.read()))
-
-    if not tmp.get("ignore_case"):
-        with open(conf_fp, "r", encoding="utf-8") as f:
-            config.update(json.loads(f.read()))
-
-    tmp.pop("ignore_case")
-    config.update(merge_config(config, tmp))
-
-    with open(patch_fp, "w", encoding="utf-8") as f:
-        f.write("{}")
-
-    return config
-
-
-def put_config(config, conf_fp):
-    """保存配置到文件"""
-    with open(conf_fp, "w", encoding="utf-8") as f:
-        f.write(json.dumps(config, indent=4))
-
-
 def init_logger() -> logging.Logger:
     """初始化日志"""
     if not os.path.exists(get_resource("logs")):
@@ -514,64 +607,54 @@ def init_logger() -> logging.Logger:
     return logger
 
 
-def run_series(type_, config, fx: Callable):
-    """运行一系列操作"""
-    logger.debug(f"执行 {type_} 操作")
-    eaten = []
-    tmp = config
-    logger.debug(f"{tmp=}")
-
-    for k, v in tmp.items():
-        ttl = v.get("TTL", -1)
-        if ttl == 0:
-            if v.get("keep", globalsettings.get("keep", False)):
-                eaten.append(k)
-                logger.debug(f"id={k} 的 keep 项被设置为 true，保留其值。")
-        else:
-            if v.get("disable", globalsettings.get("disable", False)):
-                logger.debug(f"id={k} 被设置为 disable，跳过执行。")
-                continue
-            status_code = fx(k, v)
-            if status_code == 0 or v.get("ttl_failed_ok", globalsettings.get("ttl_failed_ok", False)):
-                tmp[k].update({"TTL": ttl - 1})
-
-    logger.debug(f"{eaten=}")
-    for i in eaten:
-        tmp.pop(i)
-
-    return tmp
-
-
 def main():
     logger.info(f"当前版本：{__version__}")
 
     try:
-        if Version(fr_json.get("userdata", {}).get("lastrun_version", None)) != Version(__version__):
+        # 旧版本将 lastrun_version 保存在 userdata 中
+        lastrun_version = state_store.get(
+            "lastrun_version", fr_json.get("userdata", {}).get("lastrun_version", None))
+        if Version(lastrun_version) != Version(__version__):
             for i in parse_update_action(fr_json, logger):
                 # 直接在 fr_json 主配置上做修改
                 i.run(Version(__version__))
-        put_config(fr_json, fp)
+        config_file.save(fr_json)
         # TOTA 相关代码
         if "DESTRUCTION" in fr_json["TOTA"]:
             fr_json.update({"destruction": 1})
         if "destruction" in fr_json["TOTA"]:
-            tmp = fr_json["TOTA"].get("destruction")
-            fr_json["TOTA"].update({"destruction": tmp - 1})
+            base = fr_json["TOTA"].get("destruction")
+            tmp = state_store.counter("TOTA", "destruction", base)
+            state_store.set_counter("TOTA", "destruction", base, tmp - 1)
             logger.warning(f"再启动 {tmp} 次之后自毁")
             if tmp == 0:
                 logger.critical("启动自毁程序！")
                 # TODO: 未完成！
                 # deleteFile()
-        for i in get_assistance(fr_json["TOTA"].get("assistance", [])):
-            fr_json["TOTA"]["assistance"].pop(i)
-
-        for i, fx in OPERATORS:
-            fr_json.update({i: run_series(i, fr_json.get(i, {}), fx)})
-
-        get_update()
-        fr_json["userdata"].update(
-            {"lastrun_version": Version(__version__).__str__()})
-        put_config(fr_json, fp)
+        # 已释放过的帮助文件记录在 state_store 中，不再重复释放
+        extracted = state_store.get("TOTA.assistance", [])
+        if not args.dry_run:
+            done = get_assistance(
+                [i for i in fr_json["TOTA"].get("assistance", []) if i not in extracted])
+            if done:
+                state_store.set("TOTA.assistance", extracted + done)
+
+        task_runner.sync_state(fr_json, args.reset_ttl)
+        task_runner.run(fr_json)
+
+        if args.dry_run:
+            logger.info("[dry run] 跳过更新检查")
+        elif run_deadline.expired():
+            logger.warning("已超过 run_deadline，本次跳过更新检查")
+        else:
+            get_update()
+        state_store.set("lastrun_version", Version(__version__).__str__())
+        config_file.save(fr_json)
+        logger.debug(f"连接统计: {downloader.connection_stats()}")
+        for host, item in downloader.metrics.summary().items():
+            logger.info(
+                f"下载统计 {host}: {item['transfers']} 次（失败 {item['failures']} 次，重试 {item['retries']} 次），"
+                f"{item['bytes']} 字节，{item['throughput'] / 1024:.1f} KiB/s，平均首字节 {item['avg_ttfb']:.2f}s")
     except Exception as e:
         exc_type, exc_value, exc_obj = sys.exc_info()
         logger.critical("======= FATAL ERROR =======")
@@ -580,6 +663,8 @@ def main():
         logger.critical("exception_object: \t%s" % exc_obj)
         logger.critical(f"======= FULL EXCEPTION =======\n{format_exc()}\n")
     finally:
+        downloader.close()
+        state_store.close()
         logger.info("Done.\n")
 
 
@@ -588,9 +673,10 @@ logger = init_logger()
 args = parse_args()
 fp = os.path.join(get_resource(args.configFile))
 patch_fp = os.path.join(get_resource(args.patchFile))
+config_file = ConfigFile(fp, patch_fp, logger, dry_run=args.dry_run)
 
 try:
-    fr_json = get_config(fp, patch_fp)
+    fr_json = config_file.load()
 except Exception as e:
     logger.critical(f"读取文件时出错: {e}")
     sys.exit(1)
@@ -599,15 +685,56 @@ globalsettings = fr_json.get("globalsettings", {})
 
 # 初始化配置读取器
 config_reader = ConfigReader(globalsettings)
+# TTL 计数、lastrun_version、TOTA 进度等运行状态，不再写回 config.json
+state_store = StateStore(
+    get_resource(globalsettings.get("state_file", "state.db")), readonly=args.dry_run)
+
+# 整个运行的截止时间，从程序启动时开始计算
+run_deadline = Deadline(globalsettings.get("run_deadline", 0))
 
 # 初始化操作实例
-executor = Executor(logger, resource_path, is64bitPlatform)
-downloader = Downloader(logger)
-file_deleter = FileDeleter(logger, tree_fp_gen)
+try:
+    execute_backend = default_backend(logger, globalsettings.get("execute_backend", None))
+except ValueError as e:
+    logger.warning(f"{e}，使用缺省的执行后端")
+    execute_backend = default_backend(logger)
+executor = Executor(logger, resource_path, is64bitPlatform, execute_backend)
+http_cache = HttpCache(get_resource("cache", "http_cache.json"))
+content_store = None
+if globalsettings.get("store_max_size", 0) > 0:
+    content_store = ContentStore(
+        globalsettings.get("store_dir", get_resource("cache", "store")),
+        globalsettings["store_max_size"], logger)
+downloader = Downloader(
+    logger,
+    max_per_host=globalsettings.get("download_per_host", 0),
+    pool_size=globalsettings.get("pool_size", 4),
+    keep_alive=globalsettings.get("keep_alive", True),
+    http_cache=http_cache,
+    content_store=content_store,
+    max_bandwidth=globalsettings.get("max_bandwidth", 0),
+    connect_timeout=globalsettings.get("connect_timeout", 10),
+    read_timeout=globalsettings.get("read_timeout", 60),
+    adaptive_chunks=globalsettings.get("adaptive_chunks", True),
+    metrics=MetricsHub(
+        get_resource("logs", "metrics.jsonl") if globalsettings.get("metrics_file", False) else None,
+        logger)
+)
+file_deleter = FileDeleter(logger, tree_entries)
+retry_scheduler = RetryScheduler(can_retry, CircuitBreaker(
+    globalsettings.get("breaker_threshold", 5),
+    globalsettings.get("breaker_cooldown", 300)
+), logger)
 
 # 操作映射表
 OPERATORS = (("execute", run), ("deleteFile", deleteFile),
              ("download", download))
+# 各类操作的并发数，缺省为 1（串行）
+OPERATOR_WORKERS = {
+    "execute": globalsettings.get("execute_workers", 1),
+    "download": globalsettings.get("download_workers", 1),
+}
+task_runner = TaskRunner(logger, state_store, OPERATORS, globalsettings, OPERATOR_WORKERS)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,17 @@
 # 保留原有的时间检查相关函数（向后兼容）
-from .file_deleter import FileDeleter, DeletionError
+from .file_deleter import FileDeleter, EntryFilter, DeletionError
 from .downloader import Downloader, DownloadError
+from .http_cache import HttpCache
+from .content_store import ContentStore
+from .metrics import MetricsHub, TransferMetrics
+from .retry_policy import CircuitBreaker, RetryPolicy, RetryScheduler
 from .executor import Executor, ExecutionError
+from .exec_backend import ExecutionResult, ShellExecuteBackend, SubprocessBackend, default_backend
+from .scheduler import DagScheduler
+from .task_runner import DRY_RUN, TaskRunner
+from .priority import PriorityQueue
+from .deadline import BUDGET_EXCEEDED, DEFERRED, Deadline, DeadlineExceeded
+from .state_store import StateStore
 from .misc import add_startup_task
 import re
 import time
@@ -12,7 +22,28 @@ __all__ = [
     "Executor",
     "Downloader",
     "FileDeleter",
+    "EntryFilter",
+    "HttpCache",
+    "ContentStore",
+    "MetricsHub",
+    "TransferMetrics",
+    "CircuitBreaker",
+    "RetryPolicy",
+    "RetryScheduler",
+    "DagScheduler",
+    "TaskRunner",
+    "PriorityQueue",
+    "Deadline",
+    "DeadlineExceeded",
+    "BUDGET_EXCEEDED",
+    "DEFERRED",
+    "DRY_RUN",
+    "StateStore",
     "ExecutionError",
+    "ExecutionResult",
+    "ShellExecuteBackend",
+    "SubprocessBackend",
+    "default_backend",
     "DownloadError",
     "DeletionError",
     "add_startup_task"
@@ -0,0 +1,35 @@
+__all__ = ["AdaptiveChunker"]
+
+
+class AdaptiveChunker:
+    """根据观测到的吞吐量调整每次读取的字节数
+
+    目标是每次读取耗时约 target_interval 秒：网速快时读取块变大，减少 Python 层的调用次数；
+    网速慢时读取块变小，保证限速和进度统计足够平滑。块大小始终为 2 的幂。
+    """
+
+    def __init__(
+        self,
+        minimum: int = 16384,
+        maximum: int = 1024 * 1024,
+        target_interval: float = 0.05
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_interval = target_interval
+        self.size = minimum
+
+    def observe(self, nbytes: int, seconds: float):
+        if nbytes < self.size:
+            # 读取不满通常意味着到达结尾或对端暂时没有数据，不作为调整依据
+            return
+        if seconds <= 0:
+            want = self.maximum
+        else:
+            want = nbytes / seconds * self.target_interval
+        size = self.size
+        if want >= size * 2:
+            size *= 2
+        elif want < size / 2:
+            size //= 2
+        self.size = max(self.minimum, min(self.maximum, size))
@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+__all__ = ["HostLimiter"]
+
+
+class HostLimiter:
+    """按主机限制并发连接数
+
+    max_per_host <= 0 表示不限制。
+    """
+
+    def __init__(self, max_per_host: int = 0):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _get_semaphore(self, host: str):
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.max_per_host)
+                self._semaphores[host] = sem
+            return sem
+
+    @contextmanager
+    def acquire(self, url: str):
+        if self.max_per_host <= 0:
+            yield
+            return
+        sem = self._get_semaphore(self.host_of(url))
+        with sem:
+            yield
@@ -0,0 +1,153 @@
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+from .hashing import hash_file
+
+__all__ = ["ContentStore"]
+
+
+class ContentStore:
+    """按哈希值寻址的本地文件仓库
+
+    文件保存在 <root>/<algorithm>/<digest[:2]>/<digest>，同一文件的多个算法条目互为硬链接。
+    条目与下载的目标文件也可能互为硬链接（共享 mtime），因此最近使用时间记录在条目旁的
+    <digest>.used 文件的 mtime 上，不修改条目本身。
+    仓库的大小在首次加入文件时统计一次，之后随加入的文件累加，超过 max_size 时才重新统计，
+    并按最近使用时间淘汰最久未使用的文件。
+    """
+
+    USED_SUFFIX = ".used"
+
+    def __init__(self, root: str, max_size: int, logger=None):
+        self.root = root
+        self.max_size = max_size
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._size = None
+
+    def path_for(self, algorithm: str, digest: str) -> str:
+        digest = digest.lower()
+        return os.path.join(self.root, algorithm.lower(), digest[:2], digest)
+
+    def lookup(self, checksum: Dict[str, str]) -> Optional[str]:
+        """查找与 checksum 匹配的条目，找到时刷新其使用时间"""
+        for algorithm, digest in checksum.items():
+            path = self.path_for(algorithm, digest)
+            if os.path.isfile(path):
+                self._touch(path)
+                return path
+        return None
+
+    def _touch(self, path: str):
+        """记录条目的最近使用时间"""
+        marker = path + self.USED_SUFFIX
+        try:
+            with open(marker, "a"):
+                pass
+            os.utime(marker)
+        except OSError:
+            pass
+
+    def verify(self, path: str, checksum: Dict[str, str]) -> bool:
+        """条目可能因硬链接被外部修改，使用前校验一次"""
+        actual = hash_file(path, checksum)
+        if all(actual[k].lower() == v.lower() for k, v in checksum.items()):
+            return True
+        self.discard(checksum)
+        return False
+
+    @staticmethod
+    def _link_or_copy(src: str, dst: str):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = dst + ".tmp"
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+    def materialize(self, path: str, file_path: str):
+        """将条目放置到 file_path（优先使用硬链接，否则复制）"""
+        self._link_or_copy(path, file_path)
+
+    def ingest(self, file_path: str, checksum: Dict[str, str]):
+        """将已校验的文件加入仓库"""
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            first = None
+            for algorithm, digest in checksum.items():
+                path = self.path_for(algorithm, digest)
+                if not os.path.isfile(path):
+                    self._link_or_copy(first or file_path, path)
+                    if first is None:
+                        self._size += os.path.getsize(path)
+                first = first or path
+            self._touch(first)
+            if self._size > self.max_size:
+                self._evict()
+
+    def discard(self, checksum: Dict[str, str]):
+        with self._lock:
+            size = None
+            for algorithm, digest in checksum.items():
+                path = self.path_for(algorithm, digest)
+                if os.path.isfile(path):
+                    size = os.path.getsize(path)
+                    os.unlink(path)
+                self._unlink_marker(path)
+            if size is not None and self._size is not None:
+                self._size -= size
+
+    def _unlink_marker(self, path: str):
+        try:
+            os.unlink(path + self.USED_SUFFIX)
+        except OSError:
+            pass
+
+    def _scan(self) -> tuple:
+        """遍历仓库，返回 ([[大小, 最近使用时间, [路径...]], ...], 总大小)
+
+        以 inode 分组，互为硬链接的条目只计算一次大小，并一起淘汰。
+        """
+        groups = {}
+        used = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(self.USED_SUFFIX):
+                    used[path[:-len(self.USED_SUFFIX)]] = st.st_mtime
+                    continue
+                key = (st.st_dev, st.st_ino) if st.st_ino else path
+                group = groups.setdefault(key, [st.st_size, 0.0, []])
+                group[1] = max(group[1], st.st_mtime)
+                group[2].append(path)
+
+        # 没有 .used 文件的条目（旧版本加入的）使用自身的 mtime
+        for group in groups.values():
+            group[1] = max((used[i] for i in group[2] if i in used), default=group[1])
+        return list(groups.values()), sum(g[0] for g in groups.values())
+
+    def _evict(self):
+        groups, total = self._scan()
+        for size, _, paths in sorted(groups, key=lambda g: g[1]):
+            if total <= self.max_size:
+                break
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                self._unlink_marker(path)
+            total -= size
+            if self.logger is not None:
+                self.logger.debug(f"仓库空间不足，淘汰 {paths}")
+        self._size = total
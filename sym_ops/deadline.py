@@ -0,0 +1,63 @@
+import time
+from typing import Callable, Optional
+
+__all__ = ["Deadline", "DeadlineExceeded", "BUDGET_EXCEEDED", "DEFERRED"]
+
+# 参考 retry.md
+BUDGET_EXCEEDED = 143
+DEFERRED = 144
+
+
+class DeadlineExceeded(Exception):
+    """超过截止时间"""
+    pass
+
+
+class Deadline:
+    """基于 time.monotonic 的截止时间
+
+    seconds 为空或 <= 0 表示不限时。
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.clock = clock
+        self.expires = clock() + seconds if seconds and seconds > 0 else None
+
+    def __bool__(self):
+        return self.expires is not None
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数（可能为负数），不限时为 None"""
+        if self.expires is None:
+            return None
+        return self.expires - self.clock()
+
+    def expired(self) -> bool:
+        return self.expires is not None and self.clock() >= self.expires
+
+    def fits(self, seconds: Optional[float] = None) -> bool:
+        """剩余时间是否足够运行 seconds 秒（为空时只要求尚未到期）"""
+        remaining = self.remaining()
+        if remaining is None:
+            return True
+        return remaining > 0 and (not seconds or seconds <= remaining)
+
+    def earliest(self, other: "Deadline") -> "Deadline":
+        """两个截止时间中较早的一个"""
+        if other.expires is None:
+            return self
+        if self.expires is None or other.expires < self.expires:
+            return other
+        return self
+
+    def clip(self, seconds: Optional[float]) -> Optional[float]:
+        """将超时时长限制在剩余时间以内（seconds 为空表示不限时）"""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        remaining = max(0.0, remaining)
+        return remaining if seconds is None else min(seconds, remaining)
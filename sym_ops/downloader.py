@@ -1,13 +1,25 @@
 import os
+import json
+import threading
 import time
-import requests
-import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict
 from requests.exceptions import (
-    SSLError, MissingSchema, ConnectionError, InvalidURL,
-    InvalidSchema, RequestException
+    SSLError, MissingSchema, ConnectionError, ConnectTimeout, InvalidURL,
+    InvalidSchema, RequestException, Timeout, ChunkedEncodingError
 )
-from urllib3.exceptions import ProtocolError
+from urllib3.exceptions import HTTPError, ProtocolError, ReadTimeoutError
+
+from .concurrency import HostLimiter
+from .chunking import AdaptiveChunker
+from .content_store import ContentStore
+from .deadline import BUDGET_EXCEEDED, Deadline, DeadlineExceeded
+from .hashing import MultiHasher, hash_file
+from .http_cache import HttpCache
+from .metrics import MetricsHub, TransferMetrics
+from .retry_policy import parse_retry_after
+from .session import SessionPool
+from .throttle import TokenBucket, throttle
 
 
 class DownloadError(Exception):
@@ -25,32 +37,106 @@ class Downloader:
         InvalidURL: (8, "Invalid URL: Failed to parse [{url}]"),
         InvalidSchema: (10, "No connection adapters were found for [{url}]"),
         ProtocolError: (2, "ProtocolError"),
+        ChunkedEncodingError: (2, "ProtocolError {url}"),
         TimeoutError: (6, "Connection Timeout"),
+        ReadTimeoutError: (6, "Connection Timeout"),
+        ConnectTimeout: (6, "Connection Timeout {url}"),
+        Timeout: (6, "Connection Timeout {url}"),
+        DeadlineExceeded: (BUDGET_EXCEEDED, "超出时间预算，停止下载 {url}"),
         ConnectionError: (9, "Failed to connect {url}"),
         RequestException: (1, "Request Error {url}"),
+        HTTPError: (1, "Request Error {url}"),
     }
 
-    def __init__(self, logger):
+    def __init__(
+        self,
+        logger,
+        max_per_host: int = 0,
+        pool_size: int = 4,
+        keep_alive: bool = True,
+        http_cache: Optional[HttpCache] = None,
+        content_store: Optional[ContentStore] = None,
+        max_bandwidth: int = 0,
+        metrics: Optional[MetricsHub] = None,
+        adaptive_chunks: bool = True,
+        connect_timeout: Optional[float] = 10,
+        read_timeout: Optional[float] = 60
+    ):
         self.logger = logger
+        # 建立连接 / 两次收到数据之间的最长等待秒数，None 表示不限时
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
         self.CHUNK_SIZE = 16384
+        # 自适应读取块的上限，同时也是每个传输复用的缓冲区大小
+        self.MAX_CHUNK_SIZE = 1024 * 1024
+        self.adaptive_chunks = adaptive_chunks
+        # 分段下载的最小文件大小，小于该值的文件总是单连接下载
+        self.SEGMENT_MIN_SIZE = 4 * 1024 * 1024
+        # 并发模式下同一主机的最大同时下载数，<= 0 表示不限制
+        self.host_limiter = HostLimiter(max_per_host)
+        # 按主机复用连接，version.json、patch.json 和主程序通常来自同一主机
+        self.sessions = SessionPool(pool_size, keep_alive)
+        # 条件请求缓存，仅在 download(use_cache=True) 时使用
+        self.http_cache = http_cache
+        # 按哈希寻址的本地仓库，带 checksum 的任务会先在这里查找
+        self.content_store = content_store
+        # 所有下载共享的总带宽（字节/秒），<= 0 表示不限速
+        self.bandwidth = TokenBucket(max_bandwidth)
+        # 每次下载结束后都会将 TransferMetrics 交给 metrics 汇总
+        self.metrics = metrics or MetricsHub(logger=logger)
+        self._local = threading.local()
+
+    def _deadline(self) -> Deadline:
+        """当前线程正在进行的下载的截止时间"""
+        return getattr(self._local, "deadline", None) or Deadline()
+
+    @property
+    def last_metrics(self) -> Optional[TransferMetrics]:
+        """当前线程最近一次下载的度量数据"""
+        return getattr(self._local, "metrics", None)
+
+    def connection_stats(self) -> dict:
+        """连接复用统计"""
+        return self.sessions.stats()
+
+    def close(self):
+        self.sessions.close()
+
+    def _map_error(self, e: Exception) -> tuple:
+        """按异常类型（含父类）查找错误码"""
+        for cls in type(e).__mro__:
+            if cls in self.ERROR_MAP:
+                return self.ERROR_MAP[cls]
+        return 127, "Unexpected Error {url}"
 
     def _handle_request(self, url: str, headers: dict) -> tuple:
         """处理 HTTP 请求，返回 (response, error_code)"""
+        deadline = self._deadline()
+        if deadline.expired():
+            self.logger.error(f"超出时间预算，停止下载 {url}")
+            return None, BUDGET_EXCEEDED
         try:
-            r = requests.get(
+            r = self.sessions.get(url).get(
                 url, stream=True, verify=True,
-                headers=headers, allow_redirects=False
+                headers=headers, allow_redirects=False,
+                timeout=(deadline.clip(self.connect_timeout), deadline.clip(self.read_timeout))
             )
             return r, 0
         except tuple(self.ERROR_MAP.keys()) as e:
-            code, msg = self.ERROR_MAP[type(e)]
+            code, msg = self._map_error(e)
             self.logger.error(msg.format(url=url))
             return None, code
         except Exception as e:
             self.logger.error(f"Unexpected Error: {e.args}")
             return None, 127
 
-    def _handle_redirects(self, url: str, headers: dict, r) -> tuple:
+    def _handle_redirects(
+        self,
+        url: str,
+        headers: dict,
+        r,
+        metrics: Optional[TransferMetrics] = None
+    ) -> tuple:
         """处理 HTTP 重定向"""
         if not (300 <= r.status_code < 400):
             return r, 0
@@ -67,17 +153,104 @@ class Downloader:
                 self.logger.error("检测到重定向循环")
                 return None, 14
 
+            # 释放连接回连接池，供下一跳复用
+            r.close()
             r, error_code = self._handle_request(latest_url, headers)
             if error_code != 0:
                 return None, error_code
 
             visited_urls.add(latest_url)
             url = latest_url
+            if metrics is not None:
+                metrics.redirects += 1
 
         return r, 0
 
-    def _save_file(self, response, file_path: str, safe_write: bool = True) -> int:
-        """保存响应内容到文件"""
+    def _iter_chunks(self, response, buckets: tuple = ()):
+        """逐块产出响应数据
+
+        未压缩的响应直接从底层连接读入一块复用的缓冲区，块大小随吞吐量自适应，
+        产出的 memoryview 只在下一次迭代前有效；其他情况使用 iter_content。
+        限速时块大小不超过令牌桶一个调整周期的流量，避免突发。
+        """
+        deadline = self._deadline()
+        encoding = response.headers.get("Content-Encoding", "identity").lower()
+        if not self.adaptive_chunks or encoding not in ("", "identity"):
+            for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                yield chunk
+                if deadline.expired():
+                    raise DeadlineExceeded()
+            return
+
+        chunker = AdaptiveChunker(self.CHUNK_SIZE, self.MAX_CHUNK_SIZE)
+        for bucket in buckets:
+            chunker.maximum = max(chunker.minimum, min(
+                chunker.maximum, int(bucket.rate * chunker.target_interval)))
+        view = memoryview(bytearray(self.MAX_CHUNK_SIZE))
+        raw = response.raw
+        while True:
+            if deadline.expired():
+                raise DeadlineExceeded()
+            st = time.monotonic()
+            n = raw.readinto(view[:chunker.size])
+            if not n:
+                break
+            chunker.observe(n, time.monotonic() - st)
+            yield view[:n]
+
+    @staticmethod
+    def _validator_of(response) -> Optional[str]:
+        """取得可用于 If-Range 的校验值（强 ETag 优先，其次 Last-Modified）"""
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return response.headers.get("Last-Modified")
+
+    def _load_resume_state(self, url: str, tmp_path: str) -> tuple:
+        """读取未完成的 .tmp 文件的续传信息，返回 (已下载字节数, 校验值)"""
+        meta_path = tmp_path + ".meta"
+        if not (os.path.isfile(tmp_path) and os.path.isfile(meta_path)):
+            return 0, None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.loads(f.read())
+        except (OSError, ValueError):
+            return 0, None
+        if meta.get("url") != url or not meta.get("validator"):
+            return 0, None
+        return os.path.getsize(tmp_path), meta["validator"]
+
+    @staticmethod
+    def _store_resume_state(url: str, tmp_path: str, validator: Optional[str]):
+        meta_path = tmp_path + ".meta"
+        if validator is None:
+            if os.path.exists(meta_path):
+                os.unlink(meta_path)
+            return
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"url": url, "validator": validator}))
+
+    @staticmethod
+    def _clear_resume_state(tmp_path: str):
+        meta_path = tmp_path + ".meta"
+        if os.path.exists(meta_path):
+            os.unlink(meta_path)
+
+    def _save_file(
+        self,
+        response,
+        file_path: str,
+        safe_write: bool = True,
+        offset: int = 0,
+        hasher: Optional[MultiHasher] = None,
+        buckets: tuple = (),
+        metrics: Optional[TransferMetrics] = None
+    ) -> int:
+        """保存响应内容到文件，offset > 0 时追加到已有的 .tmp 文件之后
+
+        hasher 不为空时，写入的数据会同时送入哈希计算；buckets 为限速用的令牌桶。
+        """
         orig_file_path = file_path
         if safe_write:
             file_path += ".tmp"
@@ -85,51 +258,218 @@ class Downloader:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
         try:
-            with open(file_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+            if offset and hasher:
+                # 续传时已有的部分只需读取一次
+                hasher.update_from_file(file_path, offset)
+            with open(file_path, "ab" if offset else "wb") as f:
+                if offset:
+                    f.truncate(offset)
+                for chunk in self._iter_chunks(response, buckets):
+                    throttle(buckets, len(chunk))
                     f.write(chunk)
+                    if hasher:
+                        hasher.update(chunk)
+                    if metrics is not None:
+                        metrics.bytes += len(chunk)
+        except tuple(self.ERROR_MAP.keys()) as e:
+            # 传输中断：保留 .tmp 文件，下次重试时从断点继续
+            # requests 的异常是 IOError 的子类，必须在 OSError 之前处理
+            code, msg = self._map_error(e)
+            self.logger.error(
+                f"{msg.format(url=response.url)} - 已接收 {os.path.getsize(file_path)} 字节")
+            return code
         except OSError as e:
             self.logger.error(
-                f"无法保存至 {file_path} (Error {e.winerror}: {e.strerror})"
+                f"无法保存至 {file_path} (Error {getattr(e, 'winerror', e.errno)}: {e.strerror})"
             )
             return 192
 
         self.logger.debug(f"下载为 {file_path}")
 
         if safe_write:
-            if os.path.exists(orig_file_path):
-                os.unlink(orig_file_path)
-            os.rename(file_path, orig_file_path)
+            self._clear_resume_state(file_path)
+            self._replace_target(file_path, orig_file_path)
 
         return 0
 
-    def _verify_checksum(self, file_path: str, checksum: Dict[str, str]) -> int:
-        """验证文件哈希"""
-        self.logger.debug("校验文件中. . .")
-        for algorithm, expected_hash in checksum.items():
-            self.logger.debug(f"校验文件的 {algorithm} 值")
+    @staticmethod
+    def _replace_target(tmp_path: str, file_path: str):
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+        os.rename(tmp_path, file_path)
 
-            actual_hash = self._calculate_hash(file_path, algorithm)
-            if actual_hash.lower() != expected_hash.lower():
+    def _fetch_segment(
+        self,
+        url: str,
+        headers: dict,
+        file_path: str,
+        start: int,
+        end: int,
+        validator: str,
+        buckets: tuple = (),
+        deadline: Optional[Deadline] = None
+    ) -> Optional[int]:
+        """下载 [start, end] 字节并写入文件对应位置
+
+        在分段下载的线程中运行，deadline 为所属下载任务的截止时间。
+        返回 None 表示服务器未按范围响应，需要回退为单连接下载。
+        """
+        self._local.deadline = deadline
+        seg_headers = dict(headers)
+        seg_headers.update(
+            {"Range": f"bytes={start}-{end}", "If-Range": validator})
+        r, error_code = self._handle_request(url, seg_headers)
+        if error_code != 0:
+            return error_code
+
+        with r:
+            if r.status_code != 206 or self._content_range_start(r) != start:
+                self.logger.debug(
+                    f"分段 {start}-{end} 未按范围响应: {r.status_code=}")
+                return None
+            try:
+                with open(file_path, "r+b") as f:
+                    f.seek(start)
+                    for chunk in self._iter_chunks(r, buckets):
+                        throttle(buckets, len(chunk))
+                        f.write(chunk)
+                    if f.tell() != end + 1:
+                        self.logger.error(
+                            f"分段 {start}-{end} 不完整，仅写入至 {f.tell()}")
+                        return 2
+            except tuple(self.ERROR_MAP.keys()) as e:
+                # 与 _save_file 相同，requests 的异常须在 OSError 之前处理
+                code, msg = self._map_error(e)
+                self.logger.error(msg.format(url=url))
+                return code
+            except OSError as e:
                 self.logger.error(
-                    f"校验失败，文件的 {algorithm} 哈希应为 {expected_hash}，"
-                    f"实际上却是 {actual_hash}"
+                    f"无法保存至 {file_path} (Error {getattr(e, 'winerror', e.errno)}: {e.strerror})"
                 )
-                return 12
+                return 192
+        return 0
 
-            self.logger.debug(f"文件的 {algorithm} 哈希校验无误")
+    def _save_segmented(
+        self,
+        url: str,
+        headers: dict,
+        file_path: str,
+        filesize: int,
+        segments: int,
+        validator: str,
+        safe_write: bool = True,
+        buckets: tuple = ()
+    ) -> Optional[int]:
+        """将文件切分为 segments 段并行下载到预分配的文件中
+
+        返回 None 表示服务器不支持分段，调用方应回退为单连接下载。
+        """
+        orig_file_path = file_path
+        if safe_write:
+            file_path += ".tmp"
 
-        self.logger.debug("文件所有哈希校验无误")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        try:
+            with open(file_path, "wb") as f:
+                f.truncate(filesize)
+        except OSError as e:
+            self.logger.error(
+                f"无法保存至 {file_path} (Error {getattr(e, 'winerror', e.errno)}: {e.strerror})"
+            )
+            return 192
+
+        step = -(-filesize // segments)
+        ranges = [(i, min(i + step, filesize) - 1)
+                  for i in range(0, filesize, step)]
+        self.logger.debug(f"分段下载 {url}: {len(ranges)} 段，每段约 {step} 字节")
+
+        deadline = self._deadline()
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            results = list(pool.map(
+                lambda rng: self._fetch_segment(
+                    url, headers, file_path, rng[0], rng[1], validator,
+                    buckets, deadline),
+                ranges))
+
+        if any(code is None for code in results):
+            os.unlink(file_path)
+            return None
+        error_code = next((code for code in results if code != 0), 0)
+        if error_code != 0:
+            os.unlink(file_path)
+            return error_code
+
+        self.logger.debug(f"下载为 {file_path}")
+        if safe_write:
+            self._replace_target(file_path, orig_file_path)
         return 0
 
+    @staticmethod
+    def _content_range_start(response) -> int:
+        """解析 Content-Range 的起始字节，无法解析时返回 -1"""
+        content_range = response.headers.get("Content-Range", "")
+        try:
+            unit, _, rest = content_range.partition(" ")
+            if unit.strip().lower() != "bytes":
+                return -1
+            return int(rest.split("-", 1)[0])
+        except ValueError:
+            return -1
+
+    def _report_checksum(self, hasher: MultiHasher, checksum: Dict[str, str]) -> int:
+        """比对已计算的哈希值"""
+        mismatches = hasher.mismatches(checksum)
+        for algorithm, actual_hash in mismatches.items():
+            self.logger.error(
+                f"校验失败，文件的 {algorithm} 哈希应为 {checksum[algorithm]}，"
+                f"实际上却是 {actual_hash}"
+            )
+        if mismatches:
+            return 12
+
+        self.logger.debug(f"文件的 {', '.join(checksum)} 哈希校验无误")
+        return 0
+
+    def _verify_checksum(self, file_path: str, checksum: Dict[str, str]) -> int:
+        """验证磁盘上文件的哈希，所有算法共用一次读取"""
+        self.logger.debug("校验文件中. . .")
+        hasher = MultiHasher(checksum).update_from_file(file_path)
+        return self._report_checksum(hasher, checksum)
+
     @staticmethod
     def _calculate_hash(file_path: str, algorithm: str, buffering: int = 8096) -> str:
         """计算文件哈希"""
-        with open(file_path, 'rb') as f:
-            result = hashlib.new(algorithm)
-            for chunk in iter(lambda: f.read(buffering), b''):
-                result.update(chunk)
-            return result.hexdigest()
+        return MultiHasher((algorithm,)).update_from_file(
+            file_path, buffering=max(buffering, 1024 * 1024)).hexdigests()[algorithm]
+
+    def _reuse_local(self, file_path: str, checksum: Dict[str, str]) -> Optional[str]:
+        """目标文件或本地仓库中已有哈希一致的文件时，跳过网络请求
+
+        返回值: "local"（目标文件已是最新）、"store"（来自本地仓库）或 None
+        """
+        if os.path.isfile(file_path):
+            actual = hash_file(file_path, checksum)
+            if all(actual[k].lower() == v.lower() for k, v in checksum.items()):
+                self.logger.info(f"{file_path} 已是最新，跳过下载")
+                if self.content_store is not None:
+                    try:
+                        self.content_store.ingest(file_path, checksum)
+                    except OSError as e:
+                        self.logger.warning(f"无法将 {file_path} 加入本地仓库: {e}")
+                return "local"
+
+        if self.content_store is None:
+            return None
+        path = self.content_store.lookup(checksum)
+        if path is None or not self.content_store.verify(path, checksum):
+            return None
+        try:
+            self.content_store.materialize(path, file_path)
+        except OSError as e:
+            self.logger.warning(f"无法从本地仓库取出 {path}: {e}")
+            return None
+        self.logger.info(f"从本地仓库取出 {file_path}，跳过下载")
+        return "store"
 
     def download(
         self,
@@ -138,53 +478,198 @@ class Downloader:
         headers: dict,
         checksum: Optional[Dict[str, str]] = None,
         ignore_status: bool = False,
-        safe_write: bool = True
+        safe_write: bool = True,
+        segments: int = 1,
+        use_cache: bool = False,
+        cache_context: str = "",
+        bandwidth: int = 0,
+        attempt: int = 0,
+        deadline: Optional[Deadline] = None
     ) -> int:
         """
         下载文件主方法
+        segments > 1 且服务器支持 Range 时，大文件会被切分为多段并行下载
+        use_cache 为 True 时发送条件请求，远程文件未变化时返回 138 且不写入文件
+        bandwidth 为本任务的限速（字节/秒），同时受全局限速约束
+        attempt 为调用方的重试序号（0 表示首次尝试），仅用于统计
+        deadline 到期后停止下载并返回 143，safe_write 模式下已下载的部分保留用于续传
         返回值: 0=成功，其他=错误码（参考 retry.md）
         """
+        metrics = TransferMetrics(url, file_path, attempt)
+        self._local.deadline = deadline
+        try:
+            with self.host_limiter.acquire(url):
+                error_code = self._download(
+                    url, file_path, headers, checksum, ignore_status, safe_write,
+                    segments, use_cache, cache_context, bandwidth, metrics)
+        finally:
+            self._local.deadline = None
+        metrics.finish(error_code)
+        self._local.metrics = metrics
+        self.metrics.emit(metrics)
+        return error_code
+
+    def _download(
+        self,
+        url: str,
+        file_path: str,
+        headers: dict,
+        checksum: Optional[Dict[str, str]] = None,
+        ignore_status: bool = False,
+        safe_write: bool = True,
+        segments: int = 1,
+        use_cache: bool = False,
+        cache_context: str = "",
+        bandwidth: int = 0,
+        metrics: Optional[TransferMetrics] = None
+    ) -> int:
         checksum = checksum or {}
+        metrics = metrics or TransferMetrics(url, file_path)
+        # 分段下载的各段共享同一个任务令牌桶
+        buckets = tuple(b for b in (TokenBucket(bandwidth), self.bandwidth) if b)
+        use_cache = use_cache and self.http_cache is not None
+        tmp_path = file_path + ".tmp"
+
+        if checksum:
+            source = self._reuse_local(file_path, checksum)
+            if source is not None:
+                metrics.source = source
+                return 0
+
+        # 存在未完成的 .tmp 文件时尝试断点续传
+        offset, validator = 0, None
+        if safe_write:
+            offset, validator = self._load_resume_state(url, tmp_path)
+
+        request_headers = headers
+        if offset:
+            request_headers = dict(headers)
+            request_headers.update(
+                {"Range": f"bytes={offset}-", "If-Range": validator})
+            self.logger.info(f"断点续传: 从第 {offset} 字节处继续下载 {url}")
+        elif use_cache:
+            request_headers = dict(headers)
+            request_headers.update(
+                self.http_cache.conditional_headers(url, cache_context))
 
         # 请求并处理重定向
-        r, error_code = self._handle_request(url, headers)
+        r, error_code = self._handle_request(url, request_headers)
         if error_code != 0:
             return error_code
 
         # 处理重定向
-        r, error_code = self._handle_redirects(url, headers, r)
+        r, error_code = self._handle_redirects(url, request_headers, r, metrics)
         if error_code != 0:
             return error_code
 
+        if offset:
+            if r.status_code == 416:
+                # 断点已失效（例如远程文件变小），丢弃 .tmp 重新下载
+                self.logger.warning("服务器拒绝了续传范围，重新下载完整文件")
+                r.close()
+                self._clear_resume_state(tmp_path)
+                offset = 0
+                r, error_code = self._handle_request(url, headers)
+                if error_code != 0:
+                    return error_code
+                r, error_code = self._handle_redirects(url, headers, r, metrics)
+                if error_code != 0:
+                    return error_code
+            elif r.status_code == 206 and self._content_range_start(r) == offset:
+                pass
+            else:
+                # 服务器忽略了 Range 或者文件已变化，回退为完整下载
+                self.logger.warning(
+                    f"服务器不支持续传或文件已变化（{r.status_code=}），重新下载完整文件")
+                offset = 0
+
+        metrics.ttfb = r.elapsed.total_seconds()
+        metrics.resumed_from = offset
+        if r.status_code == 304 and use_cache:
+            metrics.source = "not_modified"
+            r.close()
+            self.logger.info(f"{url} 未修改，跳过下载")
+            return 138
+
         # 检查状态码
         filesize = r.headers.get("content-length", -1)
         if filesize != -1:
-            filesize = int(filesize)
+            filesize = int(filesize) + offset
 
         self.logger.info(
             f"校验: url: {url}, 大小: {filesize if filesize != -1 else '?'}")
         self.logger.debug(f"当前 UA: {headers.get('User-Agent', '<空>')}")
         self.logger.debug(f"{r.status_code=}, {r.history=}, {r.elapsed=}")
 
-        if not (ignore_status or r.status_code == 200):
+        if not (ignore_status or r.status_code == 200 or (offset and r.status_code == 206)):
             self.logger.warning(f"Error downloading file: {r.status_code=}")
+            if r.status_code in (429, 503):
+                metrics.retry_after = parse_retry_after(
+                    r.headers.get("Retry-After"))
+            r.close()
             return 13
 
+        if safe_write and not offset and r.status_code == 200:
+            self._store_resume_state(url, tmp_path, self._validator_of(r))
+
         # 保存文件
         st = time.time()
-        error_code = self._save_file(r, file_path, safe_write)
+        error_code = None
+        validator = self._validator_of(r)
+        if (segments > 1 and not offset and r.status_code == 200
+                and filesize >= self.SEGMENT_MIN_SIZE and validator
+                and r.headers.get("Accept-Ranges", "").lower() == "bytes"):
+            final_url = r.url
+            r.close()
+            error_code = self._save_segmented(
+                final_url, headers, file_path, filesize, segments, validator,
+                safe_write, buckets)
+            if error_code is None:
+                # 重新发起完整的请求，状态码、重定向与度量按单连接下载处理
+                self.logger.warning("服务器不支持分段下载，回退为单连接下载")
+                return self._download(
+                    url, file_path, headers, checksum, ignore_status, safe_write,
+                    1, use_cache, cache_context, bandwidth, metrics)
+            else:
+                metrics.segments = segments
+                if error_code == 0:
+                    metrics.bytes = filesize
+                if safe_write:
+                    self._clear_resume_state(tmp_path)
+
+        hasher = None
+        if error_code is None:
+            # 边下载边计算哈希，校验时无需再次读取文件
+            hasher = MultiHasher(checksum)
+            error_code = self._save_file(
+                r, file_path, safe_write, offset, hasher, buckets, metrics)
+        el = time.time() - st
+        metrics.transfer_time = el
         if error_code != 0:
             return error_code
 
-        el = time.time() - st
-
         # 校验哈希
         if checksum:
-            error_code = self._verify_checksum(file_path, checksum)
+            st = time.time()
+            if hasher is not None:
+                error_code = self._report_checksum(hasher, checksum)
+            else:
+                # 分段下载的数据不是顺序到达的，完成后整体读取一次
+                error_code = self._verify_checksum(file_path, checksum)
+            metrics.checksum_time = time.time() - st
             if error_code != 0:
                 return error_code
 
+        if use_cache:
+            self.http_cache.store(url, r, cache_context)
+        if checksum and self.content_store is not None:
+            try:
+                self.content_store.ingest(file_path, checksum)
+            except OSError as e:
+                self.logger.warning(f"无法将 {file_path} 加入本地仓库: {e}")
+
         self.logger.info(
-            f"Download complete, Time used: response={r.elapsed.total_seconds():.2f}s, download={el:.2f}s."
+            f"Download complete, Time used: response={r.elapsed.total_seconds():.2f}s, download={el:.2f}s, "
+            f"speed={metrics.throughput / 1024:.1f} KiB/s."
         )
         return 0
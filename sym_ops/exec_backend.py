@@ -0,0 +1,172 @@
+import os
+import subprocess
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional
+
+__all__ = [
+    "ExecutionResult",
+    "ExecutionBackend",
+    "ShellExecuteBackend",
+    "SubprocessBackend",
+    "default_backend",
+]
+
+# 参考 retry.md
+EXIT_NONZERO = 140
+WAIT_TIMEOUT = 141
+LAUNCH_FAILED = 142
+
+
+@dataclass
+class ExecutionResult:
+    """一次程序执行的结果
+
+    status 已归一化：0 表示成功，其余取值参考 retry.md。
+    exit_code 为后端返回的原始值（ShellExecute 返回码或进程退出码），未等待时为 None。
+    """
+    status: int
+    exit_code: Optional[int] = None
+    pid: Optional[int] = None
+    runtime: float = 0.0
+    # 进程峰值常驻内存的上限（字节），无法获取时为 None。
+    # 来自 wait4 的 ru_maxrss：Linux 上包含子进程 fork 时从父进程继承的内存，
+    # 即使 /bin/true 也会报告与父进程相当的值，只有明显大于父进程时才反映程序本身的占用
+    peak_rss: Optional[int] = None
+    timed_out: bool = False
+
+
+class ExecutionBackend(ABC):
+    """启动程序的后端
+
+    launch 的 command 是 [程序, 参数...]；wait 为 True 时等待程序结束，
+    timeout（秒）不为空时超过时限会结束该进程。
+    子类必须实现 launch，否则无法实例化。
+    """
+
+    name = ""
+    can_wait = False
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    @abstractmethod
+    def launch(
+        self,
+        command: List[str],
+        workdir: str,
+        elevated: bool = False,
+        wait: bool = False,
+        timeout: Optional[float] = None
+    ) -> ExecutionResult:
+        """启动 command，返回 ExecutionResult"""
+
+
+class ShellExecuteBackend(ExecutionBackend):
+    """Windows ShellExecuteW，支持 UAC 提权（runas），无法得知程序何时结束"""
+
+    name = "shell"
+
+    def launch(self, command, workdir, elevated=False, wait=False, timeout=None):
+        import ctypes
+
+        if wait:
+            self.logger.warning("ShellExecute 无法等待程序结束，wait 实际成为无效设置。")
+        code = ctypes.windll.shell32.ShellExecuteW(
+            None,
+            "runas" if elevated else "open",
+            command[0],
+            " ".join(str(p) for p in command[1:]),
+            str(workdir),
+            1
+        )
+        # ShellExecuteW 若执行成功则返回大于 32 的值，否则为错误码
+        return ExecutionResult(0 if code > 32 else code, code)
+
+
+class SubprocessBackend(ExecutionBackend):
+    """subprocess 启动程序
+
+    等待时在 POSIX 上用 os.wait4 回收子进程，以取得峰值内存的上限。不支持提权。
+    """
+
+    name = "subprocess"
+    can_wait = True
+    # 超时后先 terminate，等待该秒数后仍未退出则 kill
+    KILL_GRACE = 5.0
+
+    def launch(self, command, workdir, elevated=False, wait=False, timeout=None):
+        if elevated:
+            self.logger.warning("subprocess 后端不支持提权，uac_admin 实际成为无效设置。")
+        started = time.monotonic()
+        proc = subprocess.Popen([str(p) for p in command], cwd=str(workdir))
+        if not wait:
+            return ExecutionResult(0, pid=proc.pid)
+
+        if hasattr(os, "wait4"):
+            exit_code, peak_rss, timed_out = self._wait4(proc, timeout)
+        else:
+            exit_code, peak_rss, timed_out = self._wait(proc, timeout)
+        runtime = time.monotonic() - started
+
+        if timed_out:
+            status = WAIT_TIMEOUT
+        else:
+            status = EXIT_NONZERO if exit_code else 0
+        return ExecutionResult(status, exit_code, proc.pid, runtime, peak_rss, timed_out)
+
+    def _wait(self, proc: subprocess.Popen, timeout: Optional[float]):
+        try:
+            return proc.wait(timeout), None, False
+        except subprocess.TimeoutExpired:
+            return self._stop(proc), None, True
+
+    def _stop(self, proc: subprocess.Popen) -> int:
+        self.logger.warning(f"pid={proc.pid} 运行超时，结束该进程")
+        proc.terminate()
+        try:
+            return proc.wait(self.KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            return proc.wait()
+
+    def _wait4(self, proc: subprocess.Popen, timeout: Optional[float]):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        timed_out = False
+        delay = 0.001
+        while True:
+            if deadline is None:
+                pid, status, usage = os.wait4(proc.pid, 0)
+            else:
+                pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if not timed_out and time.monotonic() >= deadline:
+                timed_out = True
+                proc.terminate()
+                self.logger.warning(f"pid={proc.pid} 运行超时，结束该进程")
+                deadline = time.monotonic() + self.KILL_GRACE
+            elif timed_out and time.monotonic() >= deadline:
+                proc.kill()
+                deadline = None
+                continue
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+        # 已由 wait4 回收，告知 Popen 避免重复回收
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # Linux 的 ru_maxrss 单位为 KiB，macOS 为字节
+        peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        return proc.returncode, peak_rss, timed_out
+
+
+def default_backend(logger, name: Optional[str] = None) -> ExecutionBackend:
+    """按名称创建后端，缺省时 Windows 使用 ShellExecute，其他平台使用 subprocess"""
+    if name is None:
+        name = ShellExecuteBackend.name if os.name == "nt" else SubprocessBackend.name
+    for backend in (ShellExecuteBackend, SubprocessBackend):
+        if backend.name == name:
+            return backend(logger)
+    raise ValueError(f"未知的执行后端: {name}")
@@ -1,8 +1,9 @@
 import os
-import ctypes
 from typing import List, Optional
 from os import PathLike
 
+from .exec_backend import LAUNCH_FAILED, ExecutionBackend, ExecutionResult, default_backend
+
 
 class ExecutionError(Exception):
     """执行操作异常"""
@@ -12,10 +13,18 @@ class ExecutionError(Exception):
 class Executor:
     """负责程序执行逻辑"""
 
-    def __init__(self, logger, resource_path_fn, is64bit_fn):
+    def __init__(
+        self,
+        logger,
+        resource_path_fn,
+        is64bit_fn,
+        backend: Optional[ExecutionBackend] = None
+    ):
+        """backend: 启动程序的后端，缺省按平台选择（见 exec_backend.default_backend）"""
         self.logger = logger
         self.resource_path = resource_path_fn
         self.is64bit = is64bit_fn
+        self.backend = backend if backend is not None else default_backend(logger)
 
     def _get_psexec_path(self) -> str:
         """获取 PsExec 可执行文件路径"""
@@ -41,23 +50,20 @@ class Executor:
         workdir: str,
         use_admin: bool,
         psexec_fp: str
-    ) -> tuple:
+    ) -> List[str]:
         """构建 PsExec 命令"""
-        params_str = " ".join((str(p) for p in parameters))
-        cmd = (
-            f"-d -i {'-s' if use_admin else '-l'} -w {workdir} "
-            f"-accepteula -nobanner {exec_fp} {params_str}"
-        )
-        return psexec_fp, cmd
+        return [
+            psexec_fp, "-d", "-i", "-s" if use_admin else "-l", "-w", workdir,
+            "-accepteula", "-nobanner", exec_fp, *parameters
+        ]
 
     def _build_direct_command(
         self,
         exec_fp: str,
         parameters: List[str]
-    ) -> tuple:
+    ) -> List[str]:
         """构建直接执行命令"""
-        params_str = " ".join((str(p) for p in parameters))
-        return exec_fp, params_str
+        return [exec_fp, *parameters]
 
     def execute(
         self,
@@ -66,20 +72,24 @@ class Executor:
         uac_admin: bool = False,
         use_psexec: bool = False,
         workdir: Optional[PathLike] = None,
-        disable: bool = False
-    ) -> int:
+        disable: bool = False,
+        wait: bool = False,
+        timeout: Optional[float] = None
+    ) -> ExecutionResult:
         """
         执行程序
-        返回值: ShellExecute 返回码
+        wait: 等待程序结束并收集退出码、运行时间和峰值内存上限（后端支持时）
+        timeout: 等待的时限（秒），超时后结束该进程
+        返回值: ExecutionResult，其 status 为 0 表示成功
         """
         if disable:
             self.logger.info(f"假装启动: {exec_fp=}")
-            return 0
+            return ExecutionResult(0)
 
         # 验证可执行文件
         error_code = self._validate_executable(exec_fp)
         if error_code != 0:
-            return error_code
+            return ExecutionResult(error_code)
 
         parameters = parameters or []
         workdir = workdir or os.getcwd()
@@ -89,7 +99,7 @@ class Executor:
         psexec_exists = os.path.exists(psexec_fp)
 
         if use_psexec and psexec_exists:
-            final_exec_fp, final_params = self._build_psexec_command(
+            command = self._build_psexec_command(
                 exec_fp, parameters, str(workdir), uac_admin, psexec_fp
             )
         else:
@@ -97,25 +107,29 @@ class Executor:
                 self.logger.warning(
                     f"{psexec_fp} 路径不存在，use_psexec 实际成为无效设置。"
                 )
-            final_exec_fp, final_params = self._build_direct_command(
-                exec_fp, parameters)
+            command = self._build_direct_command(exec_fp, parameters)
 
         self.logger.debug(
-            f"启动: {exec_fp=}, {parameters=}, {uac_admin=}, {workdir=}, {use_psexec=}"
+            f"启动: {exec_fp=}, {parameters=}, {uac_admin=}, {workdir=}, {use_psexec=}, "
+            f"backend={self.backend.name}, {wait=}, {timeout=}"
         )
 
         # 执行
-        exit_code = ctypes.windll.shell32.ShellExecuteW(
-            None,
-            "runas" if uac_admin else "open",
-            final_exec_fp,
-            final_params,
-            str(workdir),
-            1
-        )
-
-        self.logger.info(
-            f"启动 {exec_fp} 完成（不一定启动成功），返回状态码为 {exit_code}"
-        )
+        try:
+            result = self.backend.launch(command, str(workdir), uac_admin, wait, timeout)
+        except OSError as e:
+            self.logger.error(f"启动 {exec_fp} 失败: {e}")
+            return ExecutionResult(LAUNCH_FAILED)
+
+        if wait and self.backend.can_wait:
+            self.logger.info(
+                f"{exec_fp} 已结束，退出码 {result.exit_code}，耗时 {result.runtime:.2f}s"
+                + (f"，峰值内存不超过 {result.peak_rss / 1048576:.1f} MiB"
+                   if result.peak_rss is not None else "")
+            )
+        else:
+            self.logger.info(
+                f"启动 {exec_fp} 完成（不一定启动成功），返回状态码为 {result.exit_code}"
+            )
 
-        return exit_code
+        return result
@@ -1,5 +1,9 @@
+import fnmatch
 import os
-from typing import Generator, List, Dict
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple
 
 
 class DeletionError(Exception):
@@ -7,35 +11,213 @@ class DeletionError(Exception):
     pass
 
 
+class PathTrie:
+    """按路径分量组织的前缀树，用于记录删除失败的项目
+
+    contains(path): path 本身或其某个祖先已被记录（path 位于失败的子树内）
+    is_ancestor(path): path 本身或其某个后代已被记录（path 不能被删除）
+    两者都是 O(深度)。
+    """
+
+    _END = object()
+
+    def __init__(self):
+        self._root = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def _parts(path: str) -> List[str]:
+        return os.path.normcase(os.path.normpath(path)).split(os.sep)
+
+    def add(self, path: str) -> bool:
+        """记录 path，返回是否为新记录"""
+        node = self._root
+        for part in self._parts(path):
+            node = node.setdefault(part, {})
+        if self._END in node:
+            return False
+        node[self._END] = True
+        self._count += 1
+        return True
+
+    def contains(self, path: str) -> bool:
+        node = self._root
+        for part in self._parts(path):
+            node = node.get(part)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+    def is_ancestor(self, path: str) -> bool:
+        node = self._root
+        for part in self._parts(path):
+            node = node.get(part)
+            if node is None:
+                return False
+        return True
+
+
+class EntryFilter:
+    """deleteFile 的过滤条件，只作用于文件，使用遍历时已取得的 stat 数据
+
+    include / exclude: glob 列表，匹配相对于 src 的路径，分隔符统一为 "/"。
+        不含 "/" 的模式匹配任意层级的文件名（如 "*.log"），
+        含 "/" 的模式从 src 开始逐级匹配（如 "logs/*.log"），"**" 匹配任意多级目录。
+        exclude 匹配到的文件夹整体保留，不再进入。
+    min_age / max_age: 按修改时间计算的天数范围
+    min_size / max_size: 字节数范围
+    """
+
+    def __init__(
+        self,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        min_age: Optional[float] = None,
+        max_age: Optional[float] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        now: Optional[float] = None
+    ):
+        self.include = [self._split(i) for i in self._as_list(include)]
+        self.exclude = [self._split(i) for i in self._as_list(exclude)]
+        now = time.time() if now is None else now
+        # 转换为 mtime 的范围，避免逐个文件计算年龄
+        self.mtime_max = now - min_age * 86400 if min_age is not None else None
+        self.mtime_min = now - max_age * 86400 if max_age is not None else None
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def __bool__(self):
+        return bool(self.include or self.exclude) or any(
+            i is not None for i in (self.mtime_max, self.mtime_min, self.min_size, self.max_size))
+
+    @staticmethod
+    def _as_list(patterns) -> List[str]:
+        if not patterns:
+            return []
+        return [patterns] if isinstance(patterns, str) else list(patterns)
+
+    @staticmethod
+    def _split(pattern: str) -> Tuple[str, ...]:
+        parts = tuple(i for i in pattern.replace("\\", "/").split("/") if i)
+        # 不含路径的模式匹配任意层级
+        return parts if len(parts) > 1 or parts[:1] == ("**",) else ("**",) + parts
+
+    @classmethod
+    def _match(cls, pattern: Tuple[str, ...], parts: Tuple[str, ...]) -> bool:
+        if not pattern:
+            return not parts
+        if pattern[0] == "**":
+            return any(cls._match(pattern[1:], parts[i:]) for i in range(len(parts) + 1))
+        return bool(parts) and fnmatch.fnmatch(parts[0], pattern[0]) \
+            and cls._match(pattern[1:], parts[1:])
+
+    @classmethod
+    def _may_match_below(cls, pattern: Tuple[str, ...], parts: Tuple[str, ...]) -> bool:
+        """目录 parts 之下是否可能存在匹配 pattern 的文件"""
+        if not pattern:
+            return False
+        if pattern[0] == "**":
+            return True
+        if not parts:
+            return True
+        return fnmatch.fnmatch(parts[0], pattern[0]) \
+            and cls._may_match_below(pattern[1:], parts[1:])
+
+    @staticmethod
+    def _parts(rel: str) -> Tuple[str, ...]:
+        return tuple(rel.replace(os.sep, "/").split("/"))
+
+    def accepts(self, rel: str, entry) -> bool:
+        """文件是否应被删除（rel 为相对于 src 的路径）"""
+        if self.min_size is not None and entry.size < self.min_size:
+            return False
+        if self.max_size is not None and entry.size > self.max_size:
+            return False
+        if self.mtime_max is not None and entry.mtime > self.mtime_max:
+            return False
+        if self.mtime_min is not None and entry.mtime < self.mtime_min:
+            return False
+        parts = self._parts(rel)
+        if self.include and not any(self._match(i, parts) for i in self.include):
+            return False
+        return not any(self._match(i, parts) for i in self.exclude)
+
+    def prunes(self, rel: str) -> bool:
+        """目录是否可以整体跳过：被 exclude 匹配，或其下不可能有文件匹配 include"""
+        parts = self._parts(rel)
+        if any(self._match(i, parts) for i in self.exclude):
+            return True
+        return bool(self.include) and not any(
+            self._may_match_below(i, parts) for i in self.include)
+
+
 class FileDeleter:
     """负责文件删除逻辑"""
 
+    # 预估删除耗时所用的单项开销（秒），取自本地 NTFS/ext4 上的经验值，
+    # 删除耗时主要取决于项目数量而不是字节数
+    EST_FILE_COST = 0.0004
+    EST_DIR_COST = 0.0006
+
     def __init__(self, logger, tree_gen_fn):
+        """tree_gen_fn: 目录树遍历函数，签名与 sym_utils.tree_entries 相同"""
         self.logger = logger
         self.tree_gen = tree_gen_fn
 
-    def _get_file_list(
+    def _walk(
         self,
-        fp: str,
-        del_folders: bool = True,
-        recursive: bool = True
-    ) -> Generator | List:
-        """获取要删除的文件列表"""
-        if os.path.isfile(fp):
-            return [fp]
-        return self.tree_gen(fp, del_folders, recursive)
-
-    def _delete_file(self, file_path: str) -> int:
-        """删除单个文件，返回文件大小"""
+        root: str,
+        del_folders: bool,
+        failed: PathTrie,
+        retained: PathTrie,
+        entry_filter: Optional[EntryFilter] = None,
+        base: Optional[str] = None
+    ) -> Iterator:
+        """遍历要删除的项目（目录在其内容之后产出，root 为文件时只产出其本身）
+
+        无法读取的目录记入 failed，被过滤条件排除的文件和整体跳过的目录记入 retained；
+        过滤条件中的相对路径以 base（缺省为 root）为起点。
+        """
+        prefix = len(os.path.join(base or root, ""))
+
+        def relpath(path):
+            return path[prefix:] or os.path.basename(path)
+
+        def prune(entry):
+            if failed.contains(entry.path):
+                return True
+            if entry_filter and entry_filter.prunes(relpath(entry.path)):
+                self.logger.debug(f"keep: {entry.path}")
+                retained.add(entry.path)
+                return True
+            return False
+
+        for entry in self.tree_gen(
+                root, del_folders, True,
+                onerror=self._scan_error_handler(failed), prune=prune):
+            if entry_filter and not entry.is_dir \
+                    and not entry_filter.accepts(relpath(entry.path), entry):
+                retained.add(entry.path)
+                continue
+            yield entry
+
+    def _delete_file(self, file_path: str, file_size: Optional[int] = None) -> int:
+        """删除单个文件，返回文件大小（已知大小时不再 stat）"""
         try:
-            file_size = os.path.getsize(file_path)
-            os.chmod(file_path, 0o777)
-            os.unlink(file_path)
+            if file_size is None:
+                file_size = os.path.getsize(file_path)
+            self._unlink(file_path)
             self.logger.debug(f"del file: {file_path}")
             return file_size
         except OSError as e:
             self.logger.warning(
-                f"Delete failed, error {e.winerror}: {e.strerror} "
+                f"Delete failed, error {getattr(e, 'winerror', e.errno)}: {e.strerror} "
                 f"(Code {e.errno}) {e.filename=}, {e.filename2=}."
             )
             raise
@@ -58,19 +240,224 @@ class FileDeleter:
             return True
         except OSError as e:
             self.logger.warning(
-                f"Delete failed, error {e.winerror}: {e.strerror} "
+                f"Delete failed, error {getattr(e, 'winerror', e.errno)}: {e.strerror} "
                 f"(Code {e.errno}) {e.filename=}, {e.filename2=}."
             )
             raise
 
+    def _scan(
+        self,
+        root: str,
+        failed: PathTrie,
+        retained: PathTrie,
+        entry_filter: Optional[EntryFilter] = None
+    ) -> Tuple[List[Tuple[str, int]], List[Tuple[int, str]]]:
+        """遍历目录树（不跟随符号链接）
+
+        返回 ([(文件路径, 大小)], [(深度, 目录路径)])，大小取自遍历时的 stat。
+        """
+        files, dirs = [], []
+        for entry in self._walk(root, True, failed, retained, entry_filter):
+            if entry.is_dir:
+                dirs.append((entry.depth, entry.path))
+            else:
+                files.append((entry.path, entry.size))
+        return files, dirs
+
+    def _scan_error_handler(self, failed: PathTrie):
+        def onerror(e: OSError):
+            self.logger.warning(f"无法读取目录 {e.filename}: {e.strerror}")
+            failed.add(e.filename)
+        return onerror
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except PermissionError:
+            # 只读文件：去掉只读属性后再试一次
+            os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+            os.unlink(path)
+
+    @staticmethod
+    def _rmdir(path: str):
+        try:
+            os.rmdir(path)
+        except PermissionError:
+            os.chmod(path, 0o777)
+            os.rmdir(path)
+
+    def _delete_parallel(
+        self,
+        file_path: str,
+        del_folders: bool,
+        only_subfolders: bool,
+        workers: int,
+        entry_filter: Optional[EntryFilter] = None
+    ) -> Tuple[Dict[str, int], PathTrie, int]:
+        """并行删除：线程池删除文件，再按深度自底向上删除目录
+
+        删除失败或被过滤条件保留的项目所在的各级父目录不会再尝试删除。
+        返回 (统计, 删除失败的项目, 因删除失败而保留的目录数)。
+        """
+        stats = {"files": 0, "dirs": 0, "size": 0}
+        root = os.path.normpath(file_path)
+        failed = PathTrie()
+        retained = PathTrie()
+        files, dirs = self._scan(root, failed, retained, entry_filter)
+        kept = 0
+
+        def delete_file(item):
+            path, size = item
+            try:
+                self._unlink(path)
+                return path, size, None
+            except OSError as e:
+                return path, size, e
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, size, error in pool.map(delete_file, files):
+                if error is None:
+                    stats["files"] += 1
+                    stats["size"] += size
+                else:
+                    self.logger.warning(f"Delete failed: {path} ({error.strerror})")
+                    failed.add(path)
+
+            if del_folders:
+                # 同一深度的目录互不依赖，逐层并行删除
+                levels = {}
+                for depth, path in dirs:
+                    levels.setdefault(depth, []).append(path)
+                for depth in sorted(levels, reverse=True):
+                    batch = []
+                    for path in levels[depth]:
+                        if only_subfolders and path == root:
+                            continue
+                        if failed.is_ancestor(path):
+                            kept += not failed.contains(path)
+                            continue
+                        if retained.is_ancestor(path):
+                            continue
+                        batch.append(path)
+
+                    def delete_dir(path):
+                        try:
+                            self._rmdir(path)
+                            return path, None
+                        except OSError as e:
+                            return path, e
+
+                    for path, error in pool.map(delete_dir, batch):
+                        if error is None:
+                            stats["dirs"] += 1
+                        else:
+                            self.logger.warning(
+                                f"Delete failed: {path} ({error.strerror})")
+                            failed.add(path)
+
+        return stats, failed, kept
+
+    def _plan_subtree(
+        self,
+        path: str,
+        base: str,
+        entry_filter: Optional[EntryFilter] = None
+    ) -> Tuple[int, int, int, int, bool]:
+        """统计子树，返回 (文件数, 可删除的目录数, 字节数, 无法读取的目录数, 是否有保留的项目)"""
+        files = dirs = size = 0
+        failed = PathTrie()
+        retained = PathTrie()
+        for entry in self._walk(path, True, failed, retained, entry_filter, base):
+            if not entry.is_dir:
+                files += 1
+                size += entry.size
+            elif not failed.is_ancestor(entry.path) and not retained.is_ancestor(entry.path):
+                dirs += 1
+        return files, dirs, size, len(failed), bool(failed) or bool(retained)
+
+    def plan(
+        self,
+        file_path: str,
+        del_folders: bool = True,
+        only_subfolders: bool = False,
+        workers: int = 1,
+        top: int = 5,
+        entry_filter: Optional[EntryFilter] = None
+    ) -> Dict:
+        """预演删除：只扫描，不删除任何项目
+
+        顶层的各个子目录分别在线程池中扫描。
+        返回值: {"files", "dirs", "size": 将删除的数量/字节数,
+                 "unreadable": 无法读取的目录数,
+                 "largest": [(顶层子目录, 将删除的字节数), ...]（按大小降序，最多 top 项）,
+                 "estimated_time": 按 workers 并行删除的预估耗时（秒）}
+        """
+        result = {"files": 0, "dirs": 0, "size": 0, "unreadable": 0,
+                  "largest": [], "estimated_time": 0.0}
+        if not os.path.exists(file_path):
+            self.logger.error(f"{file_path} - 文件不存在")
+            return result
+
+        # 第一层：顶层文件直接计入，顶层子目录收集起来交给线程池
+        subdirs = []
+        root_kept = False
+
+        def collect(entry):
+            nonlocal root_kept
+            if entry_filter and entry_filter.prunes(os.path.basename(entry.path)):
+                root_kept = True
+            else:
+                subdirs.append(entry.path)
+            return True
+
+        root_is_dir = False
+        for entry in self.tree_gen(file_path, True, True, prune=collect):
+            if entry.is_dir:
+                root_is_dir = True
+            elif entry_filter and not entry_filter.accepts(
+                    os.path.basename(entry.path), entry):
+                root_kept = True
+            else:
+                result["files"] += 1
+                result["size"] += entry.size
+
+        def scan(path):
+            return self._plan_subtree(path, file_path, entry_filter)
+
+        sizes = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for path, (files, dirs, size, unreadable, partial) in zip(
+                    subdirs, pool.map(scan, subdirs)):
+                result["files"] += files
+                result["dirs"] += dirs
+                result["size"] += size
+                result["unreadable"] += unreadable
+                root_kept = root_kept or partial
+                sizes.append((path, size))
+
+        if not del_folders:
+            result["dirs"] = 0
+        elif root_is_dir and not only_subfolders and not root_kept:
+            result["dirs"] += 1
+        result["largest"] = sorted(sizes, key=lambda i: i[1], reverse=True)[:top]
+        result["estimated_time"] = (
+            result["files"] * self.EST_FILE_COST
+            + result["dirs"] * self.EST_DIR_COST) / max(1, workers)
+        return result
+
     def delete(
         self,
         file_path: str,
         del_folders: bool = True,
-        only_subfolders: bool = False
+        only_subfolders: bool = False,
+        workers: int = 1,
+        entry_filter: Optional[EntryFilter] = None
     ) -> Dict[str, int]:
         """
         删除文件/目录
+        workers > 1 时对目录使用并行删除
+        entry_filter 不为空时只删除满足条件的文件，文件夹在清空后才会被删除
         返回值: {"files": 删除文件数, "dirs": 删除目录数, "size": 总字节数}
         """
         if not os.path.exists(file_path):
@@ -79,35 +466,50 @@ class FileDeleter:
 
         self.logger.info(f"删除 [{file_path}] 及其所属文件")
 
+        if workers > 1 and os.path.isdir(file_path):
+            stats, failed, kept = self._delete_parallel(
+                file_path, del_folders, only_subfolders, workers, entry_filter)
+            self._report(stats, failed, kept)
+            return stats
+
         stats = {"files": 0, "dirs": 0, "size": 0}
-        exclude_dirs = set()
+        # 删除失败的项目；它们的祖先目录不会再尝试删除，后代也不会再进入
+        failed = PathTrie()
+        # 被过滤条件保留的项目，它们的祖先目录同样不会删除
+        retained = PathTrie()
+        kept = 0
 
-        file_list = self._get_file_list(file_path, del_folders, True)
+        file_list = self._walk(file_path, del_folders, failed, retained, entry_filter)
 
-        for item in file_list:
-            # 跳过已标记为失败的目录
-            if item in exclude_dirs:
+        for entry in file_list:
+            item = entry.path
+            # 跳过包含删除失败项目的目录
+            if entry.is_dir and failed.is_ancestor(item):
+                if not failed.contains(item):
+                    kept += 1
                 self.logger.debug(f"skip: {item}")
                 continue
+            if entry.is_dir and retained.is_ancestor(item):
+                self.logger.debug(f"keep: {item}")
+                continue
 
             try:
-                if os.path.isfile(item):
-                    file_size = self._delete_file(item)
+                if not entry.is_dir:
+                    file_size = self._delete_file(item, entry.size)
                     stats["size"] += file_size
                     stats["files"] += 1
                 else:
                     if self._delete_directory(item, file_path, only_subfolders):
                         stats["dirs"] += 1
             except OSError:
-                # 标记该目录及其父目录为失败
-                tmp = item
-                while os.path.normpath(tmp) != os.path.normpath(file_path):
-                    tmp = os.path.dirname(tmp)
-                    exclude_dirs.add(tmp)
+                failed.add(item)
+
+        self._report(stats, failed, kept)
+        return stats
 
+    def _report(self, stats: Dict[str, int], failed: PathTrie, kept: int):
         self.logger.info(
             f"总计删除 {stats['size']} 字节，{stats['files']} 个文件，"
-            f"{stats['dirs']} 个文件夹，删除失败 {len(exclude_dirs)} 个项目。"
+            f"{stats['dirs']} 个文件夹，删除失败 {len(failed)} 个项目"
+            + (f"，{kept} 个文件夹因包含删除失败的项目而保留。" if kept else "。")
         )
-
-        return stats
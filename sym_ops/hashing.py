@@ -0,0 +1,56 @@
+import hashlib
+from typing import Dict, Iterable
+
+__all__ = ["MultiHasher", "hash_file"]
+
+# 读取磁盘文件时使用的缓冲区大小
+BUFFER_SIZE = 1024 * 1024
+
+
+class MultiHasher:
+    """同时计算多个哈希值，数据只需经过一次"""
+
+    def __init__(self, algorithms: Iterable[str]):
+        self._hashes = {i: hashlib.new(i) for i in algorithms}
+
+    def __bool__(self):
+        return bool(self._hashes)
+
+    def update(self, data):
+        for h in self._hashes.values():
+            h.update(data)
+
+    def hexdigests(self) -> Dict[str, str]:
+        return {k: v.hexdigest() for k, v in self._hashes.items()}
+
+    def mismatches(self, expected: Dict[str, str]) -> Dict[str, str]:
+        """返回 {算法: 实际哈希} 中与 expected 不一致的部分"""
+        actual = self.hexdigests()
+        return {
+            k: actual[k] for k, v in expected.items()
+            if actual[k].lower() != v.lower()
+        }
+
+    def update_from_file(self, file_path: str, size: int = -1,
+                         buffering: int = BUFFER_SIZE):
+        """从文件开头读取 size 字节（-1 表示整个文件）送入哈希"""
+        buf = bytearray(buffering)
+        view = memoryview(buf)
+        with open(file_path, "rb", buffering=0) as f:
+            remaining = size
+            while remaining != 0:
+                want = buffering if remaining < 0 else min(buffering, remaining)
+                n = f.readinto(view[:want])
+                if not n:
+                    break
+                self.update(view[:n])
+                if remaining > 0:
+                    remaining -= n
+        return self
+
+
+def hash_file(file_path: str, algorithms: Iterable[str],
+              buffering: int = BUFFER_SIZE) -> Dict[str, str]:
+    """单次读取文件，计算所有指定的哈希值"""
+    return MultiHasher(algorithms).update_from_file(
+        file_path, buffering=buffering).hexdigests()
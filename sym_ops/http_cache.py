@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+from typing import Optional
+
+__all__ = ["HttpCache"]
+
+
+class HttpCache:
+    """按 URL 记录 ETag/Last-Modified，用于条件请求（If-None-Match/If-Modified-Since）
+
+    只保存校验值，不保存响应内容：收到 304 时调用方应直接跳过后续的解析与合并。
+    context 用于区分同一 URL 在不同本地状态下的结果（例如本地版本号），
+    context 不一致时不发送条件请求。
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.isfile(self.index_path):
+                try:
+                    with open(self.index_path, "r", encoding="utf-8") as f:
+                        self._entries = json.loads(f.read())
+                except (OSError, ValueError):
+                    self._entries = {}
+        return self._entries
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._entries))
+        os.replace(tmp_path, self.index_path)
+
+    def conditional_headers(self, url: str, context: str = "") -> dict:
+        with self._lock:
+            entry = self._load().get(url)
+        if not entry or entry.get("context") != context:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, response, context: str = ""):
+        etag: Optional[str] = response.headers.get("ETag")
+        last_modified: Optional[str] = response.headers.get("Last-Modified")
+        with self._lock:
+            entries = self._load()
+            if not (etag or last_modified):
+                if entries.pop(url, None) is not None:
+                    self._save()
+                return
+            entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "context": context,
+            }
+            self._save()
+
+    def invalidate(self, url: str):
+        with self._lock:
+            if self._load().pop(url, None) is not None:
+                self._save()
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+__all__ = ["TransferMetrics", "MetricsHub"]
+
+
+@dataclass
+class TransferMetrics:
+    """单次下载的度量数据"""
+    url: str
+    file_path: str
+    attempt: int = 0
+    started: float = field(default_factory=time.time)
+    status: Optional[int] = None
+    # network / local（目标文件已是最新）/ store（来自本地仓库）/ not_modified（304）
+    source: str = "network"
+    bytes: int = 0
+    resumed_from: int = 0
+    segments: int = 1
+    redirects: int = 0
+    ttfb: float = 0.0
+    transfer_time: float = 0.0
+    checksum_time: float = 0.0
+    duration: float = 0.0
+    # 服务器通过 Retry-After 要求的等待秒数（429/503）
+    retry_after: Optional[float] = None
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc.lower()
+
+    @property
+    def throughput(self) -> float:
+        """字节/秒"""
+        return self.bytes / self.transfer_time if self.transfer_time > 0 else 0.0
+
+    def finish(self, status: int):
+        self.status = status
+        self.duration = time.time() - self.started
+
+    def as_dict(self) -> dict:
+        result = asdict(self)
+        result.update({"host": self.host, "throughput": self.throughput})
+        return result
+
+
+class MetricsHub:
+    """汇总下载度量，并分发给已注册的回调
+
+    jsonl_path 不为空时，每次下载的度量会以一行 JSON 追加到该文件。
+    回调函数的签名为 hook(metrics: TransferMetrics)，回调中的异常不会影响下载。
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None, logger=None):
+        self.jsonl_path = jsonl_path
+        self.logger = logger
+        self._hooks: List[Callable[[TransferMetrics], None]] = []
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def add_hook(self, hook: Callable[[TransferMetrics], None]):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[TransferMetrics], None]):
+        self._hooks.remove(hook)
+
+    def emit(self, metrics: TransferMetrics):
+        with self._lock:
+            agg = self._hosts.setdefault(metrics.host, {
+                "transfers": 0, "failures": 0, "retries": 0, "bytes": 0,
+                "transfer_time": 0.0, "ttfb": 0.0, "checksum_time": 0.0,
+            })
+            agg["transfers"] += 1
+            agg["failures"] += metrics.status != 0
+            agg["retries"] += metrics.attempt > 0
+            agg["bytes"] += metrics.bytes
+            agg["transfer_time"] += metrics.transfer_time
+            agg["ttfb"] += metrics.ttfb
+            agg["checksum_time"] += metrics.checksum_time
+            if self.jsonl_path:
+                self._append(metrics)
+
+        for hook in list(self._hooks):
+            try:
+                hook(metrics)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.warning(f"metrics hook {hook!r} 出错: {e}")
+
+    def _append(self, metrics: TransferMetrics):
+        try:
+            os.makedirs(os.path.dirname(self.jsonl_path), exist_ok=True)
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(metrics.as_dict(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            if self.logger is not None:
+                self.logger.warning(f"无法写入 {self.jsonl_path}: {e}")
+
+    def summary(self) -> dict:
+        """按主机汇总的计数，附带平均吞吐量和平均首字节时间"""
+        with self._lock:
+            result = {}
+            for host, agg in self._hosts.items():
+                item = dict(agg)
+                item["throughput"] = (
+                    agg["bytes"] / agg["transfer_time"] if agg["transfer_time"] > 0 else 0.0)
+                item["avg_ttfb"] = agg["ttfb"] / agg["transfers"]
+                result[host] = item
+            return result
@@ -0,0 +1,54 @@
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Optional
+
+__all__ = ["PriorityQueue"]
+
+
+class PriorityQueue:
+    """按 level 出队的任务队列，level 越大越先执行
+
+    aging: 每等待 1 秒提升的 level，避免低优先级的任务一直被后来的高优先级任务插队。
+        有效优先级为 level + aging * 等待秒数，比较时各项的 aging * 当前时间相同，
+        因此堆的键取 aging * 入队时间 - level，入队后不需要再调整。
+    high_level / reserved: 空闲的执行槽不多于 reserved 个时，只有 level >= high_level 的任务可以占用，
+        相当于为高优先级任务预留执行槽（正在执行的任务无法中断，以此代替抢占）。
+    同等优先级按入队顺序出队。
+    """
+
+    def __init__(
+        self,
+        aging: float = 0.0,
+        high_level: Optional[int] = None,
+        reserved: int = 0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.aging = aging
+        self.high_level = high_level
+        self.reserved = reserved if high_level is not None else 0
+        self.clock = clock
+        self._high = []
+        self._normal = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._high) + len(self._normal)
+
+    def push(self, item: Any, level: int = 0):
+        key = self.aging * self.clock() - level
+        heap = self._high if self.high_level is not None and level >= self.high_level else self._normal
+        heapq.heappush(heap, (key, next(self._counter), item))
+
+    def pop(self, free_slots: int = 1, total_slots: int = 1) -> Optional[Any]:
+        """取出优先级最高的任务，没有可执行的任务时返回 None
+
+        free_slots / total_slots: 当前空闲的执行槽数 / 总执行槽数，至少保留一个槽给普通任务
+        """
+        candidates = [self._high]
+        if free_slots > min(self.reserved, total_slots - 1):
+            candidates.append(self._normal)
+        heap = min((i for i in candidates if i), key=lambda i: i[0], default=None)
+        if heap is None:
+            return None
+        return heapq.heappop(heap)[2]
@@ -0,0 +1,175 @@
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+from .deadline import BUDGET_EXCEEDED, Deadline
+
+__all__ = ["RetryPolicy", "CircuitBreaker", "RetryScheduler", "parse_retry_after"]
+
+# 熔断期间直接返回的错误码（参考 retry.md）
+CIRCUIT_OPEN = 15
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """指数退避 + 随机抖动（full jitter）
+
+    第 n 次重试前等待 uniform(0, min(max_delay, base_delay * factor ** n)) 秒；
+    服务器给出 Retry-After 时至少等待该时长，但超过 max_retry_after 时放弃重试。
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 1.0,
+        factor: float = 2.0,
+        max_delay: float = 60.0,
+        jitter: bool = True,
+        max_retry_after: float = 300.0
+    ):
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """返回第 attempt 次失败后的等待秒数，None 表示不应再重试"""
+        backoff = min(self.max_delay, self.base_delay * self.factor ** attempt)
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            backoff = max(backoff, retry_after)
+        return backoff
+
+
+class CircuitBreaker:
+    """按主机熔断：连续失败 threshold 次后，在 cooldown 秒内拒绝该主机的请求
+
+    冷却结束后进入半开状态，只放行一次试探请求，成功则恢复，失败则重新熔断。
+    threshold <= 0 表示不启用熔断。
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._open_until = {}
+        self._probing = set()
+
+    def allow(self, host: str) -> bool:
+        if self.threshold <= 0:
+            return True
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return True
+            if time.monotonic() < open_until or host in self._probing:
+                return False
+            self._probing.add(host)
+            return True
+
+    def record(self, host: str, success: bool):
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self._probing.discard(host)
+            if success:
+                self._failures.pop(host, None)
+                self._open_until.pop(host, None)
+                return
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.threshold:
+                self._open_until[host] = time.monotonic() + self.cooldown
+
+    def release(self, host: str):
+        """结束半开状态的试探但不改变计数"""
+        with self._lock:
+            self._probing.discard(host)
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            open_until = self._open_until.get(host)
+            return open_until is not None and time.monotonic() < open_until
+
+
+class RetryScheduler:
+    """按 retry.md 的错误码分类驱动重试
+
+    can_retry(code) 决定错误码是否可重试；只有可重试（网络类）的失败才计入熔断。
+    """
+
+    def __init__(self, can_retry: Callable[[int], bool], breaker: CircuitBreaker, logger):
+        self.can_retry = can_retry
+        self.breaker = breaker
+        self.logger = logger
+
+    def run(
+        self,
+        fn: Callable[[int], tuple],
+        retry: int,
+        policy: RetryPolicy,
+        host: str = "",
+        deadline: Optional[Deadline] = None
+    ) -> int:
+        """执行 fn(attempt) -> (code, retry_after)
+
+        retry: 1 = 不重试，n = 最多 n - 1 次重试，负数 = 无限重试（直到成功、
+        遇到不可重试的错误、主机熔断或超过 deadline），0 = 不执行
+        deadline 到期或剩余时间不足以等待下一次重试时返回 143
+        """
+        status = 1
+        deadline = deadline or Deadline()
+        attempts = itertools.count() if retry < 0 else range(retry)
+        for attempt in attempts:
+            if deadline.expired():
+                self.logger.error("超出时间预算，停止重试")
+                return BUDGET_EXCEEDED
+            if not self.breaker.allow(host):
+                self.logger.error(f"{host} 连续失败次数过多，暂停向其发起请求")
+                return CIRCUIT_OPEN
+
+            status, retry_after = fn(attempt)
+            retryable = status != 0 and self.can_retry(status)
+            if status == 0 or retryable:
+                self.breaker.record(host, status == 0)
+            else:
+                # 非网络类错误与主机状态无关，不计入熔断
+                self.breaker.release(host)
+            if not retryable:
+                break
+            if 0 <= retry <= attempt + 1:
+                break
+
+            wait = policy.delay(attempt, retry_after)
+            if wait is None:
+                self.logger.warning(
+                    f"服务器要求 {retry_after:.0f}s 后再试，超过上限，放弃重试")
+                break
+            if not deadline.fits(wait):
+                self.logger.error("剩余时间不足以等待下一次重试，停止重试")
+                return BUDGET_EXCEEDED
+            self.logger.warning(
+                f"Download failed, still trying in {wait:.1f}s... "
+                f"({attempt + 1}/{retry if retry >= 0 else '∞'})")
+            time.sleep(wait)
+
+        return status
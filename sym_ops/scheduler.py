@@ -0,0 +1,168 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .priority import PriorityQueue
+
+__all__ = ["DagScheduler", "parse_dependency"]
+
+# (操作类型, 任务 id)
+TaskKey = Tuple[str, str]
+
+
+def parse_dependency(ref: str, type_: str, known: Set[TaskKey]) -> TaskKey:
+    """解析 depends_on 中的一项
+
+    "type:id" 指向其他操作类型的任务；不带类型前缀（或同类型中恰好有该 id）时指向同类型的任务。
+    """
+    if (type_, ref) in known or ":" not in ref:
+        return type_, ref
+    dep_type, dep_id = ref.split(":", 1)
+    return dep_type, dep_id
+
+
+class DagScheduler:
+    """按 depends_on 组成的有向无环图调度 execute/download/deleteFile 任务
+
+    依赖都已成功的任务进入其操作类型的线程池，不同类型、互不依赖的任务可以同时运行。
+    运行前检查循环依赖和不存在的依赖，涉及的任务不会执行；
+    依赖的任务失败时，依赖它的任务（及其下游）也不会执行。
+    本次不执行的任务（TTL 已归零或被 disable）视为已满足的依赖。
+    同一操作类型中可以执行的任务按 level 从高到低出队。
+    """
+
+    def __init__(
+        self,
+        logger,
+        workers: Optional[Dict[str, int]] = None,
+        queue_factory: Callable[[], PriorityQueue] = PriorityQueue
+    ):
+        """workers: 各操作类型的线程池大小，缺省为 1
+        queue_factory: 为每个操作类型创建就绪任务队列
+        """
+        self.logger = logger
+        self.workers = workers or {}
+        self.queue_factory = queue_factory
+
+    def _build(
+        self,
+        tasks: List[Tuple[str, str, dict]],
+        known: Set[TaskKey]
+    ) -> Tuple[Dict[TaskKey, List[TaskKey]], Dict[TaskKey, int], Set[TaskKey]]:
+        """返回 (下游任务, 未完成的依赖数, 无法执行的任务)"""
+        pending = {(t, k) for t, k, _ in tasks}
+        dependents = {key: [] for key in pending}
+        indegree = dict.fromkeys(pending, 0)
+        blocked = set()
+
+        for type_, id_, config in tasks:
+            refs = config.get("depends_on", [])
+            if isinstance(refs, str):
+                refs = [refs]
+            for ref in refs:
+                dep = parse_dependency(ref, type_, known)
+                if dep not in known:
+                    self.logger.error(f"{type_}:{id_} 依赖的任务 {ref} 不存在，跳过执行。")
+                    blocked.add((type_, id_))
+                elif dep in pending:
+                    dependents[dep].append((type_, id_))
+                    indegree[(type_, id_)] += 1
+
+        # Kahn 算法：无法拓扑排序的任务处于环中或依赖于环中的任务
+        remaining = dict(indegree)
+        queue = deque(key for key, n in remaining.items() if n == 0)
+        while queue:
+            key = queue.popleft()
+            for dep in dependents[key]:
+                remaining[dep] -= 1
+                if remaining[dep] == 0:
+                    queue.append(dep)
+        cyclic = sorted(key for key, n in remaining.items() if n > 0)
+        if cyclic:
+            self.logger.error(
+                "存在循环依赖（或依赖于循环中的任务），以下任务不会执行: "
+                + ", ".join(f"{t}:{k}" for t, k in cyclic))
+            blocked.update(cyclic)
+        return dependents, indegree, blocked
+
+    def _skip(
+        self,
+        key: TaskKey,
+        dependents: Dict[TaskKey, List[TaskKey]],
+        skipped: Set[TaskKey],
+        reason: str
+    ):
+        stack = [key]
+        while stack:
+            key = stack.pop()
+            if key in skipped:
+                continue
+            skipped.add(key)
+            self.logger.warning(f"{key[0]}:{key[1]} {reason}，跳过执行。")
+            stack.extend(dependents[key])
+            reason = "的上游任务未执行"
+
+    def run(
+        self,
+        tasks: List[Tuple[str, str, dict]],
+        runners: Dict[str, Callable],
+        known: Iterable[TaskKey] = ()
+    ) -> Iterator[Tuple[str, str, int]]:
+        """执行任务，逐个产出 (操作类型, 任务 id, 状态码)
+
+        tasks: 本次需要执行的 [(操作类型, 任务 id, 配置)]，level 相同时按列表顺序提交
+        runners: 操作类型 -> fx(id_, config)
+        known: 配置中存在的所有任务（包括本次不执行的），用于检查依赖是否存在
+        """
+        known = set(known) | {(t, k) for t, k, _ in tasks}
+        dependents, indegree, blocked = self._build(tasks, known)
+        configs = {(t, k): v for t, k, v in tasks}
+        skipped = set()
+        for key in sorted(blocked):
+            self._skip(key, dependents, skipped, "的依赖无法满足")
+
+        ready = {}
+
+        def push(key):
+            if key[0] not in ready:
+                ready[key[0]] = self.queue_factory()
+            ready[key[0]].push(key, configs[key].get("level", 0))
+
+        for t, k, _ in tasks:
+            if indegree[(t, k)] == 0 and (t, k) not in skipped:
+                push((t, k))
+        pools = {}
+        busy = dict.fromkeys(runners, 0)
+        running = {}
+        try:
+            while running or any(ready.values()):
+                for type_, queue in ready.items():
+                    slots = max(1, self.workers.get(type_, 1))
+                    while busy[type_] < slots:
+                        key = queue.pop(slots - busy[type_], slots)
+                        if key is None:
+                            break
+                        if type_ not in pools:
+                            pools[type_] = ThreadPoolExecutor(max_workers=slots)
+                        future = pools[type_].submit(runners[type_], key[1], configs[key])
+                        running[future] = key
+                        busy[type_] += 1
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    busy[key[0]] -= 1
+                    status = future.result()
+                    yield key[0], key[1], status
+                    for dep in dependents[key]:
+                        if dep in skipped:
+                            continue
+                        if status != 0:
+                            self._skip(dep, dependents, skipped, f"的依赖 {key[0]}:{key[1]} 执行失败")
+                            continue
+                        indegree[dep] -= 1
+                        if indegree[dep] == 0:
+                            push(dep)
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
@@ -0,0 +1,74 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+__all__ = ["SessionPool"]
+
+
+class SessionPool:
+    """按主机持有 requests.Session，复用 TCP/TLS 连接
+
+    pool_size: 每个主机连接池的大小
+    keep_alive: 为 False 时每个请求都带上 Connection: close
+    """
+
+    def __init__(self, pool_size: int = 4, keep_alive: bool = True):
+        self.pool_size = max(1, pool_size)
+        self.keep_alive = keep_alive
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    @staticmethod
+    def _key(url: str) -> tuple:
+        parts = urlsplit(url)
+        return parts.scheme.lower(), parts.netloc.lower()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def get(self, url: str) -> requests.Session:
+        """获取 url 所属主机的 Session"""
+        key = self._key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._new_session()
+                self._sessions[key] = session
+            return session
+
+    def stats(self) -> dict:
+        """连接统计：请求数、新建连接数和复用次数"""
+        requests_count = connections = 0
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            adapter = session.get_adapter("http://")
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+        return {
+            "hosts": len(sessions),
+            "requests": requests_count,
+            "connections": connections,
+            "reused": max(0, requests_count - connections),
+        }
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,148 @@
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Any, Iterable, List, Optional
+
+__all__ = ["StateStore"]
+
+
+class StateStore:
+    """运行状态（TTL 计数、lastrun_version、TOTA 进度、expire 标记）的 SQLite 存储
+
+    config.json 只保存用户编写的声明式配置，每次运行的计数变化只写入本文件，
+    每次更新只涉及变化的任务。
+
+    counters 表按 (kind, id) 记录计数器：base 为建立计数时配置中的初始值，
+    配置中的值被用户修改（与 base 不同）时，计数从新值重新开始；
+    值未修改时需要调用 forget 重置（命令行参数 --reset-ttl）。
+    values 表保存其他 JSON 值。
+    readonly 为 True 时（预演）只读取，所有写入操作被忽略，也不会创建数据库文件。
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS counters ("
+        " kind TEXT NOT NULL, id TEXT NOT NULL, base INTEGER, value INTEGER NOT NULL,"
+        " expire INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (kind, id))",
+        "CREATE TABLE IF NOT EXISTS state_values (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    )
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect_readonly(self) -> sqlite3.Connection:
+        """只读打开，不创建或修改任何文件
+
+        文件不存在时使用空的内存数据库；没有未合并的 -wal 文件时以 immutable 打开，
+        否则 SQLite 会为只读连接创建 -shm/-wal 文件。
+        """
+        if not os.path.isfile(self.path):
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            return conn
+        uri = pathlib.Path(self.path).absolute().as_uri() + "?mode=ro"
+        if not os.path.exists(self.path + "-wal"):
+            uri += "&immutable=1"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None and self.readonly:
+            self._conn = self._connect_readonly()
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                for statement in self.SCHEMA:
+                    self._conn.execute(statement)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def counter(self, kind: str, id_: str, base: Optional[int]) -> Optional[int]:
+        """取得计数器的当前值；尚无记录或 base 已被修改时返回 base"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT base, value FROM counters WHERE kind = ? AND id = ?",
+                (kind, id_)).fetchone()
+        if row is None or row[0] != base:
+            return base
+        return row[1]
+
+    def set_counter(self, kind: str, id_: str, base: Optional[int], value: int):
+        if self.readonly:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO counters (kind, id, base, value) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (kind, id) DO UPDATE SET base = excluded.base, value = excluded.value",
+                (kind, id_, base, value))
+
+    def expired(self, kind: str, id_: str) -> bool:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT expire FROM counters WHERE kind = ? AND id = ?",
+                (kind, id_)).fetchone()
+        return bool(row and row[0])
+
+    def set_expired(self, kind: str, id_: str, base: int):
+        """标记任务已成功执行过（download 的 expire）"""
+        if self.readonly:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO counters (kind, id, base, value, expire) VALUES (?, ?, ?, ?, 1)"
+                " ON CONFLICT (kind, id) DO UPDATE SET expire = 1",
+                (kind, id_, base, base))
+
+    def forget(self, kind: str, id_: Optional[str] = None):
+        """删除计数器（id_ 为空时删除 kind 下的所有计数器），下次从配置中的值重新计数"""
+        if self.readonly:
+            return
+        with self._lock, self._connect() as conn:
+            if id_ is None:
+                conn.execute("DELETE FROM counters WHERE kind = ?", (kind,))
+            else:
+                conn.execute("DELETE FROM counters WHERE kind = ? AND id = ?", (kind, id_))
+
+    def prune(self, kind: str, ids: Iterable[str]) -> List[str]:
+        """删除 kind 下不在 ids 中的计数器（配置中已不存在的任务），返回被删除的 id（只读时不删除，返回空列表）"""
+        if self.readonly:
+            return []
+        keep = set(ids)
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id FROM counters WHERE kind = ?", (kind,)).fetchall()
+        removed = sorted(row[0] for row in rows if row[0] not in keep)
+        if removed:
+            with self._lock, self._connect() as conn:
+                conn.executemany(
+                    "DELETE FROM counters WHERE kind = ? AND id = ?",
+                    [(kind, i) for i in removed])
+        return removed
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM state_values WHERE key = ?", (key,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        if self.readonly:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO state_values (key, value) VALUES (?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value, ensure_ascii=False)))
@@ -0,0 +1,192 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .deadline import DEFERRED
+from .priority import PriorityQueue
+from .scheduler import DagScheduler
+
+__all__ = ["DRY_RUN", "TaskRunner"]
+
+# 预演模式（dry run）的状态码，参考 retry.md
+DRY_RUN = 139
+
+
+class TaskRunner:
+    """按 TTL/keep/disable/level（以及 depends_on）运行配置中的各类操作
+
+    TTL 的剩余次数记录在 state_store 中，配置中的 TTL 只是初始值。
+    """
+
+    def __init__(
+        self,
+        logger,
+        state_store,
+        operators: Tuple[Tuple[str, Callable], ...],
+        settings: Optional[dict] = None,
+        workers: Optional[Dict[str, int]] = None
+    ):
+        """operators: ((操作类型, fx(id_, config)), ...)，无依赖关系时按此顺序执行
+        settings: globalsettings，提供 keep/disable/ttl_failed_ok 的缺省值和任务队列的参数
+        workers: 各操作类型的并发数，缺省为 1（串行）
+        """
+        self.logger = logger
+        self.state_store = state_store
+        self.operators = tuple(operators)
+        self.settings = settings or {}
+        self.workers = workers or {}
+
+    def task_queue(self, aging: bool = True) -> PriorityQueue:
+        """按 level 排序的任务队列
+
+        aging: 是否按等待时间提升优先级；所有任务同时入队时（_dispatch）等待时间相同，无需开启
+        """
+        return PriorityQueue(
+            aging=self.settings.get("priority_aging", 10) if aging else 0,
+            high_level=self.settings.get("high_level", 3000),
+            reserved=self.settings.get("reserved_workers", 0))
+
+    def _dispatch(self, tasks: list, fx: Callable, max_workers: int = 1) -> Iterator[Tuple[str, int]]:
+        """按 level 从高到低依次（或并发）执行任务，逐个产出 (id_, status_code)"""
+        queue = self.task_queue(aging=False)
+        for k, v in tasks:
+            queue.push((k, v), v.get("level", 0))
+
+        if max_workers <= 1 or len(tasks) <= 1:
+            while queue:
+                k, v = queue.pop()
+                yield k, fx(k, v)
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            while queue or futures:
+                # 逐个补满空闲的执行槽，而不是一次性提交，使执行槽的预留（reserved_workers）生效
+                while len(futures) < max_workers:
+                    item = queue.pop(max_workers - len(futures), max_workers)
+                    if item is None:
+                        break
+                    futures[pool.submit(fx, *item)] = item[0]
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield futures.pop(future), future.result()
+
+    def _collect(self, type_: str, config: dict) -> Tuple[List[Tuple[str, dict]], List[str]]:
+        """按 TTL/keep/disable 筛选任务，返回 (需要执行的 [(id_, 配置)], 需要移除的 id)"""
+        eaten = []
+        pending = []
+
+        for k, v in config.items():
+            ttl = self.state_store.counter(type_, k, v.get("TTL", -1))
+            if ttl == 0:
+                if v.get("keep", self.settings.get("keep", False)):
+                    eaten.append(k)
+                    self.state_store.forget(type_, k)
+                    self.logger.debug(f"id={k} 的 keep 项被设置为 true，保留其值。")
+            else:
+                if v.get("disable", self.settings.get("disable", False)):
+                    self.logger.debug(f"id={k} 被设置为 disable，跳过执行。")
+                    continue
+                pending.append((k, v))
+
+        return pending, eaten
+
+    def _settle_ttl(self, type_: str, k: str, v: dict, status_code: int):
+        """执行结束后按状态码更新 TTL，推迟到下次运行或只是预演的任务 TTL 不变"""
+        if status_code in (DEFERRED, DRY_RUN):
+            return
+        base = v.get("TTL", -1)
+        if type_ == "download" and status_code == 0:
+            self.state_store.set_expired(type_, k, base)
+        if status_code == 0 or v.get("ttl_failed_ok", self.settings.get("ttl_failed_ok", False)):
+            ttl = self.state_store.counter(type_, k, base)
+            # 负数表示无限执行，不需要计数
+            if ttl >= 0:
+                self.state_store.set_counter(type_, k, base, ttl - 1)
+
+    def run_series(self, type_: str, config: dict) -> dict:
+        """运行一系列同类型的操作，返回移除了 keep 项的 config
+
+        并发数 > 1 时任务并发执行，TTL/keep 的处理与串行时一致。
+        """
+        self.logger.debug(f"执行 {type_} 操作")
+        self.logger.debug(f"{config=}")
+        pending, eaten = self._collect(type_, config)
+
+        fx = dict(self.operators)[type_]
+        for k, status_code in self._dispatch(pending, fx, self.workers.get(type_, 1)):
+            self._settle_ttl(type_, k, config[k], status_code)
+
+        self.logger.debug(f"{eaten=}")
+        for i in eaten:
+            config.pop(i)
+
+        return config
+
+    def sync_state(self, config: dict, reset: Optional[List[str]] = None):
+        """清理配置中已不存在的任务的运行状态，并按 reset（--reset-ttl）重置 TTL 计数
+
+        reset 为 None 时不重置，为空列表时重置所有任务；
+        其中的每一项为 "操作类型:id" 或 id（匹配所有操作类型中的该 id）。
+        """
+        types = [i for i, _ in self.operators]
+        for type_ in types:
+            removed = self.state_store.prune(type_, config.get(type_, {}))
+            if removed:
+                self.logger.debug(f"清理已删除的 {type_} 任务的运行状态: {', '.join(removed)}")
+
+        if reset is None:
+            return
+        if not reset:
+            for type_ in types:
+                self.state_store.forget(type_)
+            self.logger.info("已重置所有任务的 TTL")
+            return
+        for ref in reset:
+            type_, _, id_ = ref.partition(":")
+            if type_ and type_ not in types:
+                type_, id_ = "", ref
+            matched = [i for i in ([type_] if type_ else types) if id_ in config.get(i, {})]
+            if not matched:
+                self.logger.warning(f"--reset-ttl: 任务 {ref} 不存在")
+            for i in matched:
+                self.state_store.forget(i, id_)
+                self.logger.info(f"已重置 {i}:{id_} 的 TTL")
+
+    def has_dependencies(self, config: dict) -> bool:
+        """是否有任务设置了 depends_on"""
+        return any(
+            "depends_on" in v
+            for i, _ in self.operators
+            for v in config.get(i, {}).values())
+
+    def run_graph(self, config: dict):
+        """按 depends_on 调度所有操作，直接修改 config
+
+        TTL/keep/disable 的处理与 run_series 一致；依赖未满足而未执行的任务 TTL 不变。
+        """
+        self.logger.debug("按依赖关系执行操作")
+        tasks = []
+        known = []
+        eaten = {}
+        for type_, _ in self.operators:
+            series = config.setdefault(type_, {})
+            pending, eaten[type_] = self._collect(type_, series)
+            tasks.extend((type_, k, v) for k, v in pending)
+            known.extend((type_, k) for k in series)
+
+        scheduler = DagScheduler(self.logger, self.workers, self.task_queue)
+        for type_, k, status_code in scheduler.run(tasks, dict(self.operators), known):
+            self._settle_ttl(type_, k, config[type_][k], status_code)
+
+        self.logger.debug(f"{eaten=}")
+        for type_, ids in eaten.items():
+            for i in ids:
+                config[type_].pop(i)
+
+    def run(self, config: dict):
+        """运行所有操作，直接修改 config：有任务设置了 depends_on 时按依赖关系调度，否则按类型依次运行"""
+        if self.has_dependencies(config):
+            self.run_graph(config)
+            return
+        for type_, _ in self.operators:
+            config[type_] = self.run_series(type_, config.get(type_, {}))
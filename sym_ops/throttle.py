@@ -0,0 +1,43 @@
+import threading
+import time
+from typing import Iterable, Optional
+
+__all__ = ["TokenBucket", "throttle"]
+
+
+class TokenBucket:
+    """令牌桶限速器（线程安全）
+
+    rate: 每秒补充的令牌数（字节/秒），<= 0 表示不限速
+    burst: 桶容量，缺省为 1 秒的流量
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return self.rate > 0
+
+    def consume(self, n: int):
+        """取走 n 个令牌，不足时阻塞到令牌补足为止"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # 允许欠账：先取走令牌，再按欠账时长等待，保证多线程下的总速率
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def throttle(buckets: Iterable[TokenBucket], n: int):
+    for bucket in buckets:
+        bucket.consume(n)
@@ -1,12 +1,29 @@
 import ctypes
+import hashlib
+import json
+import marshal
 import os
+import shutil
 import sys
-from typing import Mapping
+import zlib
+from typing import Callable, Iterator, Mapping, NamedTuple, Optional
+
+# 可选的 JSON 加速库，未安装时使用标准库
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 __all__ = [
     "is_exec", "get_orig_path", "get_exec", "resource_path", "get_resource",
     "is_admin", "is64bitPlatform", "listdir_p_gen", "tree_fp_gen",
-    "merge_config", "ConfigReader"
+    "TreeEntry", "scan_entry", "tree_entries",
+    "merge_layers", "merge_config", "ConfigReader", "atomic_write", "JsonCodec", "json_codec",
+    "ConfigWriter", "ConfigCache", "ConfigFile"
 ]
 
 
@@ -49,27 +66,128 @@ def listdir_p_gen(__fp):
         yield os.path.join(__fp, i)
 
 
-def tree_fp_gen(__fp, folders, topdown=True):
-    if os.path.isfile(__fp):
-        yield __fp
-    else:
+class TreeEntry(NamedTuple):
+    """目录树中的一项，size/mtime 来自遍历时已取得的 stat（目录的 size 为 0）"""
+    path: str
+    is_dir: bool
+    size: int = 0
+    mtime: float = 0.0
+    depth: int = 0
+
+
+def _entry_from_dirent(entry: os.DirEntry, depth: int) -> TreeEntry:
+    try:
+        if entry.is_dir(follow_symlinks=False):
+            return TreeEntry(entry.path, True, 0, 0.0, depth)
+        st = entry.stat(follow_symlinks=False)
+        return TreeEntry(entry.path, False, st.st_size, st.st_mtime, depth)
+    except OSError:
+        return TreeEntry(entry.path, False, 0, 0.0, depth)
+
+
+def scan_entry(__fp) -> TreeEntry:
+    """为单个路径构造 TreeEntry"""
+    st = os.lstat(__fp)
+    if os.path.isdir(__fp) and not os.path.islink(__fp):
+        return TreeEntry(__fp, True, 0, st.st_mtime, 0)
+    return TreeEntry(__fp, False, st.st_size, st.st_mtime, 0)
+
+
+def _list_entries(__fp, depth, onerror):
+    try:
+        with os.scandir(__fp) as it:
+            return [_entry_from_dirent(i, depth) for i in it]
+    except OSError as e:
+        if onerror is not None:
+            onerror(e)
+        return []
+
+
+def tree_entries(
+    __fp,
+    folders: bool,
+    topdown: bool = True,
+    onerror: Optional[Callable[[OSError], None]] = None,
+    prune: Optional[Callable[[TreeEntry], bool]] = None
+) -> Iterator[TreeEntry]:
+    """以显式栈遍历目录树，产出 TreeEntry，顺序与 tree_fp_gen 一致
+
+    folders: 是否产出目录本身
+    topdown: 为 True 时目录在其内容之后产出（与 tree_fp_gen 的约定相同），否则在之前
+    onerror: 读取目录失败时的回调，缺省忽略
+    prune: 对目录返回 True 时不进入该目录（目录本身也不产出）
+    不跟随指向目录的符号链接，它们作为普通项目产出。
+    """
+    root = scan_entry(__fp)
+    if not root.is_dir:
+        yield root
+        return
+
+    if folders and not topdown:
+        yield root
+    stack = [(root, iter(_list_entries(root.path, 1, onerror)))]
+    while stack:
+        parent, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if folders and topdown:
+                yield parent
+            continue
+        if not child.is_dir:
+            yield child
+            continue
+        if prune is not None and prune(child):
+            continue
         if folders and not topdown:
-            yield __fp
-        for i in listdir_p_gen(__fp):
-            for j in tree_fp_gen(i, folders, topdown):
-                yield j
-        if folders and topdown:
-            yield __fp
+            yield child
+        stack.append((child, iter(_list_entries(
+            child.path, child.depth + 1, onerror))))
+
+
+def tree_fp_gen(__fp, folders, topdown=True):
+    for i in tree_entries(__fp, folders, topdown):
+        yield i.path
+
+
+def merge_layers(*layers: Mapping) -> dict:
+    """将多层配置依次合并（后面的层优先），返回新的字典，不修改任何输入
+
+    同一个键在各层中的值依次合并：两者都是映射时逐键合并，否则后者替换前者。
+    以显式栈一次处理所有层，只有多个层同时修改的子树才会创建新的字典，
+    其余子树直接与输入共享（修改结果中的嵌套字典前需要自行复制）。
+    键的顺序为各键在各层中首次出现的顺序，与 merge_config 一致。
+    """
+    result = {}
+    stack = [(result, layers)]
+    while stack:
+        target, sources = stack.pop()
+        if not sources:
+            continue
+        target.update(sources[0])
+        # 需要继续合并的键 -> 依次合并的映射
+        pending = {}
+        for source in sources[1:]:
+            for k, v in source.items():
+                if k in pending:
+                    if isinstance(v, Mapping):
+                        pending[k].append(v)
+                    else:
+                        del pending[k]
+                        target[k] = v
+                elif isinstance(v, Mapping) and isinstance(target.get(k), Mapping):
+                    pending[k] = [target[k], v]
+                else:
+                    target[k] = v
+        for k, v in pending.items():
+            target[k] = {}
+            stack.append((target[k], v))
+    return result
 
 
 def merge_config(conf1, conf2, ip=False):
     # conf1 <-- conf2
-    res = conf1.copy()
-    for k, v in conf2.items():
-        if k in res.keys() and isinstance(v, Mapping):
-            res[k].update(merge_config(res[k], v))
-        else:
-            res.update({k: v})
+    res = merge_layers(conf1, conf2)
     if ip:
         conf1.clear()
         conf1.update(res)
@@ -141,3 +259,296 @@ class ConfigReader:
             global_settings: 新的全局设置字典
         """
         self.global_settings = global_settings or {}
+
+
+def atomic_write(__fp, data: bytes):
+    """原子写入：先写入同目录下的临时文件并 fsync，再替换目标文件
+
+    写入过程中崩溃或断电时，目标文件要么是旧内容，要么是新内容。
+    """
+    tmp = f"{__fp}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(__fp):
+            shutil.copymode(__fp, tmp)
+        os.replace(tmp, __fp)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class JsonCodec:
+    """JSON 编解码层
+
+    backend 为 "orjson" 或 "json"（标准库），缺省时 orjson 已安装则使用 orjson。
+    orjson 只支持 2 格缩进，其他缩进由标准库序列化；
+    orjson 无法处理的内容（超过 64 位的整数、NaN 等）同样交给标准库。
+    stream_threshold: 文件不小于该字节数且 ijson 已安装时，load_items 流式解析，内存占用只与需要的项有关；
+        流式解析比完整解析慢约一倍，因此只用于很大的文件。None 表示从不流式解析。
+    """
+
+    STREAM_THRESHOLD = 32 * 1024 * 1024
+
+    def __init__(self, backend: Optional[str] = None, stream_threshold: Optional[int] = STREAM_THRESHOLD):
+        if backend is None:
+            backend = "orjson" if orjson is not None else "json"
+        if backend not in ("orjson", "json"):
+            raise ValueError(f"未知的 JSON 后端: {backend}")
+        if backend == "orjson" and orjson is None:
+            raise ValueError("orjson 未安装")
+        self.backend = backend
+        self.stream_threshold = stream_threshold
+
+    def loads(self, data):
+        if self.backend == "orjson":
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(data)
+
+    def dumps(self, obj, indent: Optional[int] = None) -> bytes:
+        """序列化为 UTF-8 字节串
+
+        orjson 不转义非 ASCII 字符；标准库保持缺省的 ASCII 转义，
+        因此 indent=4 的配置文件与以前逐字节相同。
+        """
+        if self.backend == "orjson" and indent in (None, 2):
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            try:
+                return orjson.dumps(obj, option=option)
+            except orjson.JSONEncodeError:
+                pass
+        return json.dumps(obj, indent=indent).encode("utf-8")
+
+    def load(self, __fp):
+        with open(__fp, "rb") as f:
+            return self.loads(f.read())
+
+    def _streams(self, __fp) -> bool:
+        if ijson is None or self.stream_threshold is None:
+            return False
+        try:
+            return os.path.getsize(__fp) >= self.stream_threshold
+        except OSError:
+            return False
+
+    def load_items(
+        self,
+        __fp,
+        prefix: str = "",
+        predicate: Optional[Callable[[str], bool]] = None
+    ) -> dict:
+        """读取文件中 prefix 处的对象，只保留 predicate 为空或对键返回 True 的项
+
+        prefix 以 "." 分隔各级键，空字符串表示顶层对象；prefix 不存在时返回空字典。
+        流式解析时逐项解析，不满足 predicate 的项随即丢弃，不会构造整个文档。
+        """
+        if self._streams(__fp):
+            try:
+                with open(__fp, "rb") as f:
+                    return {
+                        k: v for k, v in ijson.kvitems(f, prefix, use_float=True)
+                        if predicate is None or predicate(k)
+                    }
+            except ijson.JSONError:
+                # 部分 ijson 后端无法处理超过 64 位的整数等内容，改为完整解析
+                pass
+
+        obj = self.load(__fp)
+        for key in prefix.split(".") if prefix else ():
+            obj = obj.get(key) if isinstance(obj, Mapping) else None
+        if not isinstance(obj, Mapping):
+            return {}
+        return {k: v for k, v in obj.items() if predicate is None or predicate(k)}
+
+
+json_codec = JsonCodec()
+
+
+class ConfigWriter:
+    """保存配置文件
+
+    序列化后的内容与上次写入（或首次写入前磁盘上）的内容相同时跳过写入，
+    因此 TTL、userdata 等没有变化的运行不会重写配置文件。
+    newline: 换行符，缺省与文本模式写入时相同（os.linesep），Windows 上保持 CRLF。
+    """
+
+    def __init__(self, indent: int = 4, codec: Optional[JsonCodec] = None, newline: str = os.linesep):
+        self.indent = indent
+        self.codec = codec or json_codec
+        self.newline = newline.encode()
+        self._digests = {}
+
+    @staticmethod
+    def _digest(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _current_digest(self, __fp) -> Optional[bytes]:
+        if __fp not in self._digests:
+            try:
+                with open(__fp, "rb") as f:
+                    self._digests[__fp] = self._digest(f.read())
+            except OSError:
+                self._digests[__fp] = None
+        return self._digests[__fp]
+
+    def write(self, config, __fp) -> bool:
+        """保存 config，返回是否实际写入了文件"""
+        data = self.codec.dumps(config, indent=self.indent)
+        if self.newline != b"\n":
+            # JSON 字符串中的换行已转义，这里的换行都来自缩进
+            data = data.replace(b"\n", self.newline)
+        digest = self._digest(data)
+        if digest == self._current_digest(__fp):
+            return False
+        atomic_write(__fp, data)
+        self._digests[__fp] = digest
+        return True
+
+
+class ConfigCache:
+    """合并后配置的二进制缓存（marshal）
+
+    sources 为参与合并的文件（主配置与补丁配置），缓存中记录它们的 mtime、大小和哈希，
+    任一文件变化（或缓存由其他 Python 版本写入）时缓存失效。
+    empty_sources 中的文件（补丁配置）内容必须是空对象，否则既不写入也不使用缓存，
+    因此尚未合并的补丁不会被缓存跳过。
+    命中时跳过 JSON 解析与合并。
+    """
+
+    FORMAT = 1
+
+    def __init__(self, __fp, sources: tuple, empty_sources: tuple = ()):
+        self.path = __fp
+        self.sources = tuple(sources)
+        self.empty_sources = frozenset(empty_sources)
+
+    @staticmethod
+    def _is_empty(data: bytes) -> bool:
+        try:
+            return json_codec.loads(data) == {}
+        except ValueError:
+            return False
+
+    def _signature(self, __fp, st: Optional[os.stat_result] = None) -> Optional[tuple]:
+        """文件的 (mtime, 大小, CRC32)，文件不存在或应为空的文件不为空时返回 None"""
+        # 只用于发现文件变化（mtime 与大小都相同时才会比较），使用较快的 CRC32
+        try:
+            if st is None:
+                st = os.stat(__fp)
+            with open(__fp, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if __fp in self.empty_sources and not self._is_empty(data):
+            return None
+        return st.st_mtime_ns, st.st_size, zlib.crc32(data)
+
+    def load(self) -> Optional[dict]:
+        """缓存有效时返回合并后的配置，否则返回 None"""
+        try:
+            with open(self.path, "rb") as f:
+                fmt, version, signatures, config = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if fmt != self.FORMAT or version != sys.hexversion or len(signatures) != len(self.sources):
+            return None
+        for __fp, signature in zip(self.sources, signatures):
+            try:
+                st = os.stat(__fp)
+            except OSError:
+                return None
+            # 先比较 stat，不一致时无需读取文件
+            if (st.st_mtime_ns, st.st_size) != signature[:2] or self._signature(__fp, st) != signature:
+                return None
+        return config
+
+    def store(self, config: dict) -> bool:
+        """以 sources 的当前状态记录 config，返回是否写入成功
+
+        任一文件不存在或补丁配置不为空时不写入。
+        """
+        signatures = tuple(self._signature(i) for i in self.sources)
+        if None in signatures:
+            return False
+        try:
+            atomic_write(self.path, marshal.dumps((self.FORMAT, sys.hexversion, signatures, config)))
+        except (OSError, ValueError):
+            return False
+        return True
+
+
+class ConfigFile:
+    """主配置文件与补丁配置文件
+
+    load 合并两者（补丁覆盖主配置）并清空补丁文件，save 保存主配置。
+    两个文件都未变化时 load 直接使用上次合并的结果（ConfigCache，保存在 conf_fp + ".cache"）。
+    dry_run 为 True 时（预演）不写入任何文件：不清空补丁文件（补丁留到下次正式运行时合并），
+    不写入缓存，save 也不写入。
+    """
+
+    def __init__(
+        self,
+        conf_fp,
+        patch_fp,
+        logger,
+        dry_run: bool = False,
+        writer: Optional[ConfigWriter] = None,
+        cache: Optional[ConfigCache] = None
+    ):
+        self.conf_fp = conf_fp
+        self.patch_fp = patch_fp
+        self.logger = logger
+        self.dry_run = dry_run
+        self.writer = writer or ConfigWriter()
+        # 补丁配置不为空时（例如本次运行中下载了新的补丁）不使用缓存，下次启动时合并补丁
+        self.cache = cache or ConfigCache(conf_fp + ".cache", (conf_fp, patch_fp), empty_sources=(patch_fp,))
+
+    def load(self) -> dict:
+        """获取合并后的配置"""
+        config = self.cache.load()
+        if config is not None:
+            self.logger.debug("配置文件未变化，使用配置缓存")
+            return config
+
+        config = {}
+        tmp = {"ignore_case": False}
+        patch = None
+
+        if not os.path.exists(self.patch_fp):
+            self.logger.error(f"{self.patch_fp} 不存在，你可以将其视为空值，该文件在后续将自动创建。")
+        else:
+            patch = json_codec.load(self.patch_fp)
+            tmp.update(patch)
+
+        if not tmp.get("ignore_case"):
+            config.update(json_codec.load(self.conf_fp))
+
+        tmp.pop("ignore_case")
+        config = merge_layers(config, tmp)
+
+        # 补丁已合并，清空补丁文件（已经为空时不重写）
+        if patch != {} and not self.dry_run:
+            with open(self.patch_fp, "w", encoding="utf-8") as f:
+                f.write("{}")
+
+        # 合并了补丁的配置与主配置文件不同，由 save 写入后再缓存；预演时不写入缓存
+        if not patch and not self.dry_run:
+            self.cache.store(config)
+        return config
+
+    def save(self, config: dict) -> bool:
+        """保存主配置（原子写入，内容未变化时跳过，预演时不写入），返回是否实际写入了文件"""
+        if self.dry_run:
+            self.logger.debug(f"[dry run] 不保存 {self.conf_fp}")
+            return False
+        if not self.writer.write(config, self.conf_fp):
+            self.logger.debug(f"{self.conf_fp} 未变化，跳过写入")
+            return False
+        self.cache.store(config)
+        return True
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""ConfigCache / ConfigFile 配置缓存测试"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+
+from sym_utils import ConfigFile, ConfigWriter, json_codec
+
+logger = logging.getLogger("test_config_cache")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+def write(fp, obj):
+    with open(fp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(obj))
+    # 保证 mtime 变化（部分文件系统的时间精度较低）
+    time.sleep(0.01)
+
+
+print("=" * 60)
+print("ConfigCache / ConfigFile 配置缓存测试")
+print("=" * 60)
+
+with tempfile.TemporaryDirectory() as tmp:
+    conf_fp = os.path.join(tmp, "config.json")
+    patch_fp = os.path.join(tmp, "config.temp.json")
+    write(conf_fp, {"make-time": 1, "globalsettings": {"retry": 3}})
+    write(patch_fp, {})
+
+    # 测试1：补丁为空时第二次启动命中缓存，不重写补丁文件
+    print("\n【测试1】补丁为空时使用缓存")
+    config_file = ConfigFile(conf_fp, patch_fp, logger)
+    config = config_file.load()
+    mtime = os.stat(patch_fp).st_mtime_ns
+    assert config_file.cache.load() == config
+    config_file = ConfigFile(conf_fp, patch_fp, logger)
+    assert config_file.load() == config
+    assert os.stat(patch_fp).st_mtime_ns == mtime, "空的补丁文件被重写"
+    print("  通过")
+
+    # 测试2：第 N 次运行中下载了补丁并保存了主配置，第 N+1 次运行必须合并该补丁
+    print("\n【测试2】运行中到达的补丁在下次启动时合并")
+    config_file = ConfigFile(conf_fp, patch_fp, logger)
+    config = config_file.load()
+    write(patch_fp, {"make-time": 2030, "globalsettings": {"foo": 1}})
+    config["userdata"] = {"channel": 0}
+    config_file.save(config)
+    assert config_file.cache.load() is None, "缓存记录了未合并的补丁"
+
+    config_file = ConfigFile(conf_fp, patch_fp, logger)
+    config = config_file.load()
+    assert config["make-time"] == 2030 and config["globalsettings"] == {"retry": 3, "foo": 1}, config
+    assert json_codec.load(patch_fp) == {}
+    print(f"  合并结果: {config}")
+
+    # 补丁合并后由 put_config 写入主配置，之后再次命中缓存
+    config_file.save(config)
+    config_file = ConfigFile(conf_fp, patch_fp, logger)
+    assert config_file.cache.load() == config
+    assert config_file.load() == config
+    print("  通过")
+
+    # 测试3：缓存中记录的补丁文件被改为非空内容（大小与 mtime 恰好不变）时不命中
+    print("\n【测试3】补丁不为空时不使用缓存")
+    stat = os.stat(patch_fp)
+    with open(patch_fp, "w", encoding="utf-8") as f:
+        f.write("[]")
+    os.utime(patch_fp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert config_file.cache.load() is None
+    assert not config_file.cache.store(config)
+    print("  通过")
+
+    # 测试4：预演时不清空补丁文件
+    print("\n【测试4】预演时保留补丁")
+    write(patch_fp, {"globalsettings": {"bar": 2}})
+    config_file = ConfigFile(conf_fp, patch_fp, logger, dry_run=True)
+    config = config_file.load()
+    assert config["globalsettings"]["bar"] == 2
+    assert json_codec.load(patch_fp) == {"globalsettings": {"bar": 2}}
+    mtime = os.stat(conf_fp).st_mtime_ns
+    config_file.save(config)
+    assert os.stat(conf_fp).st_mtime_ns == mtime, "预演时写入了主配置"
+    os.unlink(config_file.cache.path)
+    write(patch_fp, {})
+    config_file = ConfigFile(conf_fp, patch_fp, logger, dry_run=True)
+    config_file.load()
+    assert not os.path.exists(config_file.cache.path), "预演时写入了配置缓存"
+    print("  通过")
+
+    # 测试5：保存时使用平台的换行符（Windows 上保持 CRLF），字符串中的换行不受影响
+    print("\n【测试5】换行符")
+    assert ConfigWriter().newline == os.linesep.encode()
+    writer = ConfigWriter(newline="\r\n")
+    config = {"a": {"b": "x\ny"}}
+    assert writer.write(config, conf_fp)
+    with open(conf_fp, "rb") as f:
+        data = f.read()
+    assert b"\r\n" in data and data.count(b"\n") == data.count(b"\r\n"), data
+    assert json_codec.load(conf_fp) == config
+    assert not ConfigWriter(newline="\r\n").write(config, conf_fp), "内容未变化时重写了配置"
+    assert ConfigWriter(newline="\n").write(config, conf_fp)
+    print("  通过")
+
+print("\n全部通过")
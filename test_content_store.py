@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""ContentStore 本地仓库测试"""
+
+import hashlib
+import os
+import tempfile
+import time
+
+from sym_ops import ContentStore
+
+
+def make_file(path: str, content: bytes) -> dict:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    # 模拟服务器时间戳，使文件 mtime 早于使用时间
+    os.utime(path, (1000000000, 1000000000))
+    return {"sha256": hashlib.sha256(content).hexdigest(), "md5": hashlib.md5(content).hexdigest()}
+
+
+print("=" * 60)
+print("ContentStore 本地仓库测试")
+print("=" * 60)
+
+with tempfile.TemporaryDirectory() as tmp:
+    root = os.path.join(tmp, "store")
+    store = ContentStore(root, 250)
+
+    # 测试1：加入与取出，多个算法的条目互为硬链接，只计算一次大小
+    print("\n【测试1】加入与取出")
+    a = make_file(os.path.join(tmp, "dl", "a.bin"), b"a" * 100)
+    store.ingest(os.path.join(tmp, "dl", "a.bin"), a)
+    path = store.lookup(a)
+    assert path is not None and store.verify(path, a)
+    assert os.path.samefile(path, store.path_for("md5", a["md5"]))
+    assert store._size == 100
+    store.materialize(path, os.path.join(tmp, "out", "a.bin"))
+    with open(os.path.join(tmp, "out", "a.bin"), "rb") as f:
+        assert f.read() == b"a" * 100
+    print("  通过")
+
+    # 测试2：lookup 记录使用时间，不修改与条目共享 inode 的目标文件的 mtime
+    print("\n【测试2】使用时间")
+    store.lookup(a)
+    assert os.stat(os.path.join(tmp, "dl", "a.bin")).st_mtime == 1000000000
+    assert os.path.isfile(path + ContentStore.USED_SUFFIX)
+    print("  通过")
+
+    # 测试3：累计大小超过上限时才遍历仓库，淘汰最久未使用的条目
+    print("\n【测试3】淘汰")
+    b = make_file(os.path.join(tmp, "dl", "b.bin"), b"b" * 100)
+    store.ingest(os.path.join(tmp, "dl", "b.bin"), b)
+    assert store._size == 200
+    time.sleep(0.05)
+    store.lookup(a)
+    scans = []
+    scan = store._scan
+    store._scan = lambda: scans.append(1) or scan()
+    c = make_file(os.path.join(tmp, "dl", "c.bin"), b"c" * 100)
+    store.ingest(os.path.join(tmp, "dl", "c.bin"), c)
+    assert len(scans) == 1
+    assert store.lookup(b) is None, "最久未使用的条目应被淘汰"
+    assert store.lookup(a) is not None and store.lookup(c) is not None
+    assert not os.path.exists(store.path_for("sha256", b["sha256"]) + ContentStore.USED_SUFFIX)
+    assert store._size == 200
+    # 重复加入已有的条目不改变大小
+    store.ingest(os.path.join(tmp, "dl", "c.bin"), c)
+    assert store._size == 200 and len(scans) == 1
+    print("  通过")
+
+    # 测试4：discard
+    print("\n【测试4】discard")
+    store.discard(c)
+    assert store.lookup(c) is None and store._size == 100
+    # 新实例首次加入文件时统计一次已有的大小
+    assert ContentStore(root, 250)._scan()[1] == 100
+    print("  通过")
+
+print("\n全部通过")
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Downloader / RetryScheduler 测试
+
+在本地 http.server 上模拟连接中断、断点续传、分段下载、304、Retry-After 与熔断。
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from sym_ops import CircuitBreaker, Deadline, Downloader, HttpCache, RetryPolicy, RetryScheduler
+
+logger = logging.getLogger("test_downloader")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+DATA = bytes(range(256)) * 256
+ETAG = '"v1"'
+SHA256 = {"sha256": hashlib.sha256(DATA).hexdigest()}
+BUSY = 503
+CIRCUIT_OPEN = 15
+BUDGET_EXCEEDED = 143
+
+
+def can_retry(code: int) -> bool:
+    """retry.md: [1..127] 可重试"""
+    return code != 0 and (code & 128) == 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    """按路径模拟不同的服务器行为
+
+    /file      支持 Range/If-Range 与 If-None-Match
+    /drop      发送一半内容后断开连接
+    /gzip-drop gzip 编码，发送一半内容后断开连接（iter_content 路径）
+    /flaky     第一次请求发送一半内容后断开，之后正常
+    /norange   声明 Accept-Ranges 但忽略 Range
+    /segdrop   起始位置不为 0 的范围请求发送一半内容后断开
+    /busy      第一次请求返回 503 与 Retry-After: 1
+    /down      总是返回 500
+    /slow      缓慢发送
+    """
+
+    hits = {}
+    log = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _empty(self, code: int, headers: dict = None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _drop(self, body: bytes):
+        self.wfile.write(body[:len(body) // 2])
+        self.wfile.flush()
+        self.connection.shutdown(socket.SHUT_RDWR)
+        self.close_connection = True
+
+    def do_GET(self):
+        path = self.path
+        with self.lock:
+            n = self.hits[path] = self.hits.get(path, 0) + 1
+            self.log.append((path, self.headers.get("Range")))
+
+        if path == "/busy" and n == 1:
+            return self._empty(BUSY, {"Retry-After": "1"})
+        if path == "/down":
+            return self._empty(500)
+        if path == "/file" and self.headers.get("If-None-Match") == ETAG:
+            return self._empty(304, {"ETag": ETAG})
+
+        start, end = 0, len(DATA) - 1
+        rng = self.headers.get("Range")
+        partial = rng and path != "/norange" and self.headers.get("If-Range", ETAG) == ETAG
+        if partial:
+            first, _, last = rng.removeprefix("bytes=").partition("-")
+            start, end = int(first), int(last) if last else end
+        body = DATA[start:end + 1]
+        if path == "/gzip-drop":
+            body = gzip.compress(body)
+
+        self.send_response(206 if partial else 200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        if path == "/gzip-drop":
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+
+        if (path in ("/drop", "/gzip-drop") or (path == "/flaky" and n == 1)
+                or (path == "/segdrop" and start > 0)):
+            return self._drop(body)
+        if path == "/slow":
+            try:
+                for i in range(0, len(body), 1024):
+                    self.wfile.write(body[i:i + 1024])
+                    time.sleep(0.02)
+            except OSError:
+                # 客户端超过时间预算后断开
+                self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+def read(fp) -> bytes:
+    with open(fp, "rb") as f:
+        return f.read()
+
+
+def requests_to(path: str) -> list:
+    return [rng for p, rng in Handler.log if p == path]
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base = f"http://127.0.0.1:{server.server_port}"
+host = urlsplit(base).netloc
+
+print("=" * 60)
+print("Downloader 测试")
+print("=" * 60)
+
+with tempfile.TemporaryDirectory() as tmp:
+    # 测试1：传输中连接中断返回可重试的错误码，.tmp 保留用于续传
+    print("\n【测试1】连接中断")
+    for path in ("/drop", "/gzip-drop"):
+        for adaptive in (True, False):
+            target = os.path.join(tmp, "drop", "file.bin")
+            code = Downloader(logger, adaptive_chunks=adaptive).download(base + path, target, {})
+            print(f"  {path} adaptive_chunks={adaptive}: {code}")
+            assert can_retry(code), code
+            assert not os.path.exists(target) and os.path.exists(target + ".tmp")
+
+    # 测试2：从已有的 .tmp 续传，哈希覆盖续传前的部分
+    print("\n【测试2】断点续传")
+    target = os.path.join(tmp, "resume", "file.bin")
+    os.makedirs(os.path.dirname(target))
+    with open(target + ".tmp", "wb") as f:
+        f.write(DATA[:1000])
+    with open(target + ".tmp.meta", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"url": base + "/file", "validator": ETAG}))
+    downloader = Downloader(logger)
+    assert downloader.download(base + "/file", target, {}, SHA256) == 0
+    assert requests_to("/file") == ["bytes=1000-"]
+    assert downloader.last_metrics.resumed_from == 1000
+    assert read(target) == DATA and not os.path.exists(target + ".tmp.meta")
+    print("  通过")
+
+    # 测试3：中断后由 RetryScheduler 重试，第二次请求从断点继续
+    print("\n【测试3】中断后重试并续传")
+    target = os.path.join(tmp, "flaky", "file.bin")
+    scheduler = RetryScheduler(can_retry, CircuitBreaker(0), logger)
+    policy = RetryPolicy(base_delay=0, jitter=False)
+
+    def attempt(url, target, checksum=None):
+        def fx(n):
+            code = downloader.download(url, target, {}, checksum, attempt=n)
+            return code, downloader.last_metrics.retry_after
+        return fx
+
+    assert scheduler.run(attempt(base + "/flaky", target, SHA256), 3, policy, host) == 0
+    ranges = requests_to("/flaky")
+    print(f"  请求: {ranges}")
+    assert len(ranges) == 2 and ranges[0] is None and ranges[1] == f"bytes={len(DATA) // 2}-"
+    assert read(target) == DATA
+
+    # 测试4：分段下载；服务器忽略 Range 时回退为单连接下载；分段中断返回可重试的错误码
+    print("\n【测试4】分段下载")
+    downloader = Downloader(logger)
+    downloader.SEGMENT_MIN_SIZE = 1024
+    target = os.path.join(tmp, "segments", "file.bin")
+    before = len(requests_to("/file"))
+    assert downloader.download(base + "/file", target, {}, SHA256, segments=4) == 0
+    assert downloader.last_metrics.segments == 4 and read(target) == DATA
+    ranges = requests_to("/file")[before:]
+    assert ranges[0] is None and sorted(ranges[1:]) == sorted(
+        f"bytes={i}-{i + len(DATA) // 4 - 1}" for i in range(0, len(DATA), len(DATA) // 4))
+    os.unlink(target)
+    assert downloader.download(base + "/norange", target, {}, SHA256, segments=4) == 0
+    assert read(target) == DATA
+    assert requests_to("/norange")[-1] is None, "回退后应重新发起完整的请求"
+    os.unlink(target)
+    code = downloader.download(base + "/segdrop", target, {}, segments=4)
+    print(f"  分段中断: {code}")
+    assert can_retry(code) and not os.path.exists(target)
+    print("  通过")
+
+    # 测试5：条件请求，远程文件未修改时返回 138 且不写入文件
+    print("\n【测试5】304")
+    downloader = Downloader(logger, http_cache=HttpCache(os.path.join(tmp, "cache", "index.json")))
+    target = os.path.join(tmp, "cache", "file.bin")
+    assert downloader.download(base + "/file", target, {}, use_cache=True) == 0
+    os.unlink(target)
+    assert downloader.download(base + "/file", target, {}, use_cache=True) == 138
+    assert not os.path.exists(target)
+    print("  通过")
+
+    # 测试6：503 + Retry-After 时至少等待该时长
+    print("\n【测试6】Retry-After")
+    target = os.path.join(tmp, "busy", "file.bin")
+    started = time.monotonic()
+    assert scheduler.run(attempt(base + "/busy", target), 3, policy, host) == 0
+    elapsed = time.monotonic() - started
+    print(f"  等待 {elapsed:.2f}s")
+    assert elapsed >= 0.9 and Handler.hits["/busy"] == 2
+
+    # 测试7：连续失败 threshold 次后熔断，冷却期间不再发起请求
+    print("\n【测试7】熔断")
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    scheduler = RetryScheduler(can_retry, breaker, logger)
+    target = os.path.join(tmp, "down", "file.bin")
+    assert scheduler.run(attempt(base + "/down", target), 5, policy, host) == CIRCUIT_OPEN
+    assert Handler.hits["/down"] == 2 and breaker.is_open(host)
+    assert scheduler.run(attempt(base + "/file", target), 5, policy, host) == CIRCUIT_OPEN
+    assert Handler.hits["/down"] == 2 and not os.path.exists(target)
+    print("  通过")
+
+    # 测试8：超过时间预算时停止下载，已下载的部分保留用于续传
+    print("\n【测试8】时间预算")
+    target = os.path.join(tmp, "slow", "file.bin")
+    started = time.monotonic()
+    assert Downloader(logger).download(base + "/slow", target, {}, deadline=Deadline(0.3)) == BUDGET_EXCEEDED
+    assert time.monotonic() - started < 1.2
+    assert not os.path.exists(target) and os.path.exists(target + ".tmp")
+    print("  通过")
+
+server.shutdown()
+print("\n全部通过")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""FileDeleter / EntryFilter / PathTrie 测试"""
+
+import logging
+import os
+import tempfile
+import time
+
+from sym_ops import EntryFilter, FileDeleter
+from sym_ops.file_deleter import PathTrie
+from sym_utils import TreeEntry, tree_entries
+
+logger = logging.getLogger("test_file_deleter")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+NOW = time.time()
+DAY = 86400
+# 相对路径 -> (字节数, 天数)
+TREE = {
+    "a.log": (100, 10),
+    "a.txt": (5, 1),
+    "logs/b.log": (2000, 40),
+    "logs/c.log": (10, 2),
+    "logs/old/d.log": (300, 90),
+    "cache/x.bin": (4096, 5),
+    "cache/sub/y.bin": (1, 100),
+    "keep/z.log": (50, 50),
+    "empty/": (0, 0),
+}
+
+
+def make_tree(root: str):
+    for rel, (size, age) in TREE.items():
+        path = os.path.join(root, *rel.rstrip("/").split("/"))
+        if rel.endswith("/"):
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        os.utime(path, (NOW - age * DAY, NOW - age * DAY))
+
+
+def remaining(root: str) -> set:
+    if not os.path.exists(root):
+        return set()
+    return {os.path.relpath(i.path, root).replace(os.sep, "/")
+            for i in tree_entries(root, True) if i.path != root}
+
+
+print("=" * 60)
+print("FileDeleter 测试")
+print("=" * 60)
+
+# 测试1：PathTrie
+print("\n【测试1】PathTrie")
+trie = PathTrie()
+assert trie.add(os.path.join("r", "a", "b")) and not trie.add(os.path.join("r", "a", "b"))
+assert len(trie) == 1
+assert trie.contains(os.path.join("r", "a", "b", "c")) and not trie.contains(os.path.join("r", "a"))
+assert trie.is_ancestor(os.path.join("r", "a")) and not trie.is_ancestor(os.path.join("r", "x"))
+assert not trie.contains(os.path.join("r", "ab"))
+print("  通过")
+
+# 测试2：include / exclude
+print("\n【测试2】include / exclude")
+
+
+def entry(size=0, age=0):
+    return TreeEntry("", False, size, NOW - age * DAY)
+
+
+f = EntryFilter(include=["*.log"], exclude=["keep"])
+assert f.accepts("a.log", entry()) and f.accepts("logs/old/d.log", entry())
+assert not f.accepts("a.txt", entry())
+assert f.prunes("keep") and not f.prunes("logs")
+f = EntryFilter(include=["logs/*.log"])
+assert f.accepts("logs/b.log", entry()) and not f.accepts("logs/old/d.log", entry())
+assert not f.accepts("a.log", entry())
+assert f.prunes("cache") and not f.prunes("logs") and f.prunes("logs/old")
+f = EntryFilter(include=["cache/**"])
+assert f.accepts("cache/x.bin", entry()) and f.accepts("cache/sub/y.bin", entry())
+assert f.prunes("logs") and not f.prunes("cache/sub")
+f = EntryFilter(exclude="**/old")
+assert f.prunes("logs/old") and f.accepts("logs/b.log", entry())
+assert not EntryFilter() and EntryFilter(min_size=0)
+print("  通过")
+
+# 测试3：age / size
+print("\n【测试3】min_age / max_age / min_size / max_size")
+f = EntryFilter(min_age=7, max_age=60, now=NOW)
+assert f.accepts("f", entry(age=10)) and f.accepts("f", entry(age=59))
+assert not f.accepts("f", entry(age=1)) and not f.accepts("f", entry(age=90))
+f = EntryFilter(min_size=10, max_size=1000)
+assert f.accepts("f", entry(size=10)) and f.accepts("f", entry(size=1000))
+assert not f.accepts("f", entry(size=9)) and not f.accepts("f", entry(size=1001))
+print("  通过")
+
+# 测试4：plan 与 delete 的统计一致，且只删除满足条件的文件
+print("\n【测试4】plan 与 delete 一致")
+cases = [
+    ("无过滤", {}, set()),
+    ("*.log，保留 keep", {"include": ["*.log"], "exclude": ["keep"]},
+     {"a.txt", "cache", "cache/x.bin", "cache/sub", "cache/sub/y.bin", "keep", "keep/z.log"}),
+    ("超过 30 天", {"min_age": 30},
+     {"a.log", "a.txt", "logs", "logs/c.log", "cache", "cache/x.bin"}),
+    ("大于 1000 字节", {"min_size": 1000},
+     {"a.log", "a.txt", "logs", "logs/c.log", "logs/old", "logs/old/d.log",
+      "cache", "cache/sub", "cache/sub/y.bin", "keep", "keep/z.log"}),
+]
+deleter = FileDeleter(logger, tree_entries)
+for name, options, expected in cases:
+    for workers in (1, 4):
+        for only_subfolders in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                root = os.path.join(tmp, "src")
+                make_tree(root)
+                entry_filter = EntryFilter(now=NOW, **options)
+                plan = deleter.plan(root, True, only_subfolders, workers, entry_filter=entry_filter)
+                stats = deleter.delete(root, True, only_subfolders, workers, entry_filter=entry_filter)
+                assert {k: plan[k] for k in stats} == stats, (name, workers, plan, stats)
+                assert remaining(root) == expected, (name, workers, remaining(root))
+                assert os.path.exists(root) == (only_subfolders or bool(expected)), name
+    print(f"  {name}: {stats}")
+
+print("\n全部通过")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""merge_layers / merge_config 配置合并测试"""
+
+import copy
+import json
+import random
+from collections.abc import Mapping
+
+from sym_utils import merge_config, merge_layers
+
+
+def legacy_merge_config(conf1, conf2, ip=False):
+    """原 sym_utils.merge_config，作为对照"""
+    res = conf1.copy()
+    for k, v in conf2.items():
+        if k in res.keys() and isinstance(v, Mapping):
+            res[k].update(legacy_merge_config(res[k], v))
+        else:
+            res.update({k: v})
+    if ip:
+        conf1.clear()
+        conf1.update(res)
+    return res
+
+
+def make_tree(width: int, depth: int, prefix: str = "") -> dict:
+    if depth == 0:
+        return {f"{prefix}k{i}": i for i in range(width)}
+    return {f"{prefix}n{i}": make_tree(width, depth - 1, f"{prefix}{i}.") for i in range(width)}
+
+
+def make_patch(tree: dict, rng: random.Random, touches: int) -> dict:
+    """随机修改 tree 中的 touches 个叶子（偶尔新增键），返回只包含修改部分的补丁"""
+    patch = {}
+    for _ in range(touches):
+        node, target = tree, patch
+        while True:
+            key = rng.choice(list(node))
+            if not isinstance(node[key], dict):
+                target[key if rng.random() > 0.1 else key + "_new"] = rng.random()
+                break
+            node = node[key]
+            target = target.setdefault(key, {})
+    return patch
+
+
+def legacy_fold(layers):
+    # 原 merge_config 会修改输入，在副本上运行
+    layers = copy.deepcopy(layers)
+    tmp = layers[0]
+    for i in layers[1:]:
+        legacy_merge_config(tmp, i, ip=True)
+    return tmp
+
+
+print("=" * 60)
+print("merge_layers 配置合并测试")
+print("=" * 60)
+
+# 测试1：基本语义
+print("\n【测试1】逐键合并、替换与新增")
+base = {"a": 1, "m": {"x": 1, "y": {"z": 1}}, "keep": {"k": 1}}
+patch = {"a": 2, "m": {"y": {"w": 2}, "n": 3}, "new": [1, 2]}
+result = merge_layers(base, patch)
+print(f"  {result}")
+assert result == {"a": 2, "m": {"x": 1, "y": {"z": 1, "w": 2}, "n": 3}, "keep": {"k": 1}, "new": [1, 2]}
+# 键的顺序为首次出现的顺序
+assert list(result) == ["a", "m", "keep", "new"] and list(result["m"]) == ["x", "y", "n"]
+
+# 测试2：与原 merge_config 的结果（包括键的顺序）一致
+print("\n【测试2】与原实现一致")
+rng = random.Random(0)
+for width, depth in ((20, 1), (4, 4), (8, 2)):
+    tree = make_tree(width, depth)
+    layers = [tree] + [make_patch(tree, rng, 10) for _ in range(8)]
+    expected = json.dumps(legacy_fold(layers))
+    assert json.dumps(merge_layers(*layers)) == expected
+    folded = layers[0]
+    for i in layers[1:]:
+        folded = merge_layers(folded, i)
+    assert json.dumps(folded) == expected
+    print(f"  {width}^{depth + 1}，{len(layers)} 层: 一致")
+
+# 测试3：不修改任何输入
+print("\n【测试3】不修改输入")
+layers = [
+    {"a": {"b": {"c": 1}}, "list": [1]},
+    {"a": {"b": {"d": 2}}, "list": [2]},
+    {"a": {"e": 3}},
+]
+snapshot = copy.deepcopy(layers)
+result = merge_layers(*layers)
+assert layers == snapshot
+# 修改结果的顶层不会影响输入
+result["a"] = None
+assert layers == snapshot
+result = merge_config(layers[0], layers[1])
+assert layers == snapshot, "merge_config 修改了 conf1 的嵌套字典"
+print("  通过")
+
+# 测试4：写时复制——只有被多个层修改的子树是新的字典，其余与输入共享
+print("\n【测试4】结构共享")
+base = {"touched": {"x": 1}, "untouched": {"y": {"z": 1}}}
+patch = {"touched": {"x": 2}, "added": {"q": 1}}
+result = merge_layers(base, patch)
+assert result["untouched"] is base["untouched"]
+assert result["added"] is patch["added"]
+assert result["touched"] is not base["touched"] and base["touched"] == {"x": 1}
+print("  通过")
+
+# 测试5：非映射的值与映射互相替换（原实现在此情况下会抛出 AttributeError）
+print("\n【测试5】标量与映射互相替换")
+assert merge_layers({"a": 1}, {"a": {"b": 1}}) == {"a": {"b": 1}}
+assert merge_layers({"a": {"b": 1}}, {"a": 2}) == {"a": 2}
+assert merge_layers({"a": {"b": 1}}, {"a": 2}, {"a": {"c": 3}}, {"a": {"d": 4}}) == {"a": {"c": 3, "d": 4}}
+assert merge_layers() == {} and merge_layers({}, {}) == {}
+print("  通过")
+
+# 测试6：merge_config 的 ip 参数
+print("\n【测试6】merge_config(ip=True)")
+conf = {"a": {"b": 1}}
+result = merge_config(conf, {"a": {"c": 2}}, ip=True)
+assert conf == result == {"a": {"b": 1, "c": 2}}
+print("  通过")
+
+print("\n全部通过")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""DagScheduler 依赖调度测试"""
+
+import logging
+import os
+import tempfile
+import threading
+
+from sym_ops import DEFERRED, DRY_RUN, DagScheduler, StateStore, TaskRunner
+
+logger = logging.getLogger("test_scheduler")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+
+def make_runners(failures=()):
+    """返回 (runners, 执行顺序)，failures 中的任务返回非 0 状态码"""
+    order = []
+    lock = threading.Lock()
+
+    def runner(type_):
+        def fx(id_, config):
+            with lock:
+                order.append(f"{type_}:{id_}")
+            return 1 if f"{type_}:{id_}" in failures else 0
+        return fx
+
+    return {i: runner(i) for i in ("execute", "download", "deleteFile")}, order
+
+
+def run(tasks, known=(), failures=(), workers=None):
+    runners, order = make_runners(failures)
+    results = {f"{t}:{k}": status for t, k, status in DagScheduler(logger, workers).run(tasks, runners, known)}
+    return results, order
+
+
+print("=" * 60)
+print("DagScheduler 依赖调度测试")
+print("=" * 60)
+
+# 测试1：跨类型依赖按拓扑顺序执行
+print("\n【测试1】先下载再执行")
+results, order = run([
+    ("execute", "setup", {"depends_on": ["download:pkg"]}),
+    ("download", "pkg", {}),
+    ("deleteFile", "cleanup", {"depends_on": "execute:setup"}),
+], workers={"execute": 2, "download": 2})
+print(f"  执行顺序: {order}")
+assert order == ["download:pkg", "execute:setup", "deleteFile:cleanup"]
+assert all(i == 0 for i in results.values())
+
+# 测试2：循环依赖及依赖于循环的任务都不执行，其余任务照常执行
+print("\n【测试2】循环依赖")
+results, order = run([
+    ("execute", "a", {"depends_on": ["b"]}),
+    ("execute", "b", {"depends_on": ["a"]}),
+    ("execute", "c", {"depends_on": ["a"]}),
+    ("execute", "d", {}),
+])
+print(f"  执行顺序: {order}")
+assert order == ["execute:d"]
+assert results == {"execute:d": 0}
+
+# 测试3：依赖不存在的任务
+print("\n【测试3】依赖不存在")
+results, order = run([
+    ("execute", "a", {"depends_on": ["download:missing"]}),
+    ("execute", "b", {"depends_on": ["a"]}),
+    ("execute", "c", {}),
+])
+print(f"  执行顺序: {order}")
+assert order == ["execute:c"]
+
+# 测试4：依赖执行失败时，下游任务（包括间接依赖）跳过，无关任务照常执行
+print("\n【测试4】依赖失败")
+results, order = run([
+    ("download", "pkg", {}),
+    ("execute", "install", {"depends_on": ["download:pkg"]}),
+    ("execute", "run", {"depends_on": ["install"]}),
+    ("execute", "other", {}),
+], failures={"download:pkg"})
+print(f"  执行顺序: {order}")
+assert sorted(order) == ["download:pkg", "execute:other"]
+assert results == {"download:pkg": 1, "execute:other": 0}
+
+# 测试5：本次不执行（disable / TTL 已归零）的任务视为已满足的依赖
+print("\n【测试5】未执行的依赖视为已满足")
+results, order = run(
+    [("execute", "run", {"depends_on": ["download:pkg"]})],
+    known=[("download", "pkg")])
+print(f"  执行顺序: {order}")
+assert order == ["execute:run"]
+
+# 测试6：同类型中可执行的任务按 level 从高到低执行
+print("\n【测试6】level 优先级")
+results, order = run([
+    ("execute", "low", {"level": 1}),
+    ("execute", "high", {"level": 100}),
+    ("execute", "mid", {"level": 50}),
+])
+print(f"  执行顺序: {order}")
+assert order == ["execute:high", "execute:mid", "execute:low"]
+
+# 测试7：run_graph 中 disable 的任务不执行，但作为依赖视为已满足；失败的依赖使下游 TTL 不变
+print("\n【测试7】TaskRunner.run_graph")
+with tempfile.TemporaryDirectory() as tmp:
+    runners, order = make_runners(failures={"download:broken"})
+    store = StateStore(os.path.join(tmp, "state.db"))
+    config = {
+        "download": {
+            "pkg": {"disable": True},
+            "broken": {"TTL": 3},
+        },
+        "execute": {
+            "run": {"depends_on": ["download:pkg"], "TTL": 2},
+            "after_broken": {"depends_on": ["download:broken"], "TTL": 2},
+        },
+    }
+    TaskRunner(logger, store, tuple(runners.items())).run(config)
+    print(f"  执行顺序: {order}")
+    assert sorted(order) == ["download:broken", "execute:run"]
+    assert store.counter("execute", "run", 2) == 1
+    assert store.counter("execute", "after_broken", 2) == 2
+    store.close()
+
+# 测试8：没有 depends_on 时按类型依次运行，TTL 归零且设置了 keep 的任务从配置中移除
+print("\n【测试8】TaskRunner.run_series")
+with tempfile.TemporaryDirectory() as tmp:
+    runners, order = make_runners(failures={"execute:fail"})
+    store = StateStore(os.path.join(tmp, "state.db"))
+    store.set_counter("execute", "done", 1, 0)
+    config = {
+        "execute": {
+            "low": {"TTL": 2, "level": 1},
+            "high": {"TTL": 2, "level": 9},
+            "fail": {"TTL": 2},
+            "done": {"TTL": 1, "keep": True},
+            "off": {"disable": True},
+        },
+        "download": {"d": {}},
+    }
+    runner = TaskRunner(logger, store, tuple(runners.items()), workers={"execute": 2})
+    assert not runner.has_dependencies(config)
+    runner.run(config)
+    print(f"  执行顺序: {order}")
+    assert sorted(order) == ["download:d", "execute:fail", "execute:high", "execute:low"]
+    assert order[-1] == "download:d"
+    assert "done" not in config["execute"] and "off" in config["execute"]
+    assert store.counter("execute", "high", 2) == 1 and store.counter("execute", "fail", 2) == 2
+
+    # ttl_failed_ok：失败也计数；DEFERRED / DRY_RUN 不计数
+    runner = TaskRunner(logger, store, (("execute", lambda k, v: {"fail": 1, "high": DEFERRED}.get(k, DRY_RUN)),),
+                        settings={"ttl_failed_ok": True})
+    runner.run_series("execute", config["execute"])
+    assert store.counter("execute", "fail", 2) == 1
+    assert store.counter("execute", "high", 2) == 1 and store.counter("execute", "low", 2) == 1
+    store.close()
+    print("  通过")
+
+print("\n全部通过")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""StateStore 运行状态存储测试"""
+
+import logging
+import os
+import tempfile
+
+from sym_ops import StateStore, TaskRunner
+
+logger = logging.getLogger("test_state_store")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+
+print("=" * 60)
+print("StateStore 运行状态存储测试")
+print("=" * 60)
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "state", "state.db")
+
+    # 测试1：计数从配置中的值开始，配置中的值被修改时重新计数
+    print("\n【测试1】TTL 计数")
+    store = StateStore(path)
+    assert store.counter("execute", "a", 3) == 3
+    store.set_counter("execute", "a", 3, 2)
+    assert store.counter("execute", "a", 3) == 2
+    assert store.counter("execute", "a", 5) == 5, "配置中的 TTL 被修改后应重新计数"
+    store.set_counter("execute", "a", 5, 4)
+    assert store.counter("execute", "a", 5) == 4
+    print("  通过")
+
+    # 测试2：关闭后重新打开，状态保留
+    print("\n【测试2】持久化")
+    store.set_expired("download", "d", 1)
+    store.set("lastrun_version", "v1.6.5")
+    store.close()
+    store = StateStore(path)
+    assert store.counter("execute", "a", 5) == 4
+    assert store.expired("download", "d") and not store.expired("download", "other")
+    assert store.get("lastrun_version") == "v1.6.5" and store.get("missing", []) == []
+    print("  通过")
+
+    # 测试3：TTL 未修改时通过 forget 重置
+    print("\n【测试3】重置")
+    store.set_counter("execute", "b", 3, 0)
+    store.forget("execute", "a")
+    assert store.counter("execute", "a", 5) == 5
+    assert store.counter("execute", "b", 3) == 0
+    store.forget("execute")
+    assert store.counter("execute", "b", 3) == 3
+    print("  通过")
+
+    # 测试4：清理配置中已不存在的任务
+    print("\n【测试4】清理")
+    for i in ("x", "y", "z"):
+        store.set_counter("deleteFile", i, 2, 1)
+    assert store.prune("deleteFile", ["y"]) == ["x", "z"]
+    assert store.counter("deleteFile", "x", 2) == 2 and store.counter("deleteFile", "y", 2) == 1
+    assert store.prune("deleteFile", {"y": {}}) == []
+    print("  通过")
+
+    # 测试5：只读模式（--dry-run）忽略所有写入
+    print("\n【测试5】只读")
+    store.close()
+    readonly = StateStore(path, readonly=True)
+    readonly.set_counter("deleteFile", "y", 2, 0)
+    readonly.set("lastrun_version", "v0")
+    readonly.forget("deleteFile")
+    assert readonly.prune("deleteFile", []) == []
+    assert readonly.counter("deleteFile", "y", 2) == 1
+    assert readonly.get("lastrun_version") == "v1.6.5"
+    readonly.close()
+    # 数据库不存在时不创建任何文件
+    missing = os.path.join(tmp, "missing", "state.db")
+    readonly = StateStore(missing, readonly=True)
+    readonly.set_counter("execute", "a", 3, 1)
+    assert readonly.counter("execute", "a", 3) == 3 and readonly.get("k", 0) == 0
+    readonly.close()
+    assert not os.path.exists(os.path.dirname(missing))
+    assert sorted(os.listdir(os.path.dirname(path))) == ["state.db"], os.listdir(os.path.dirname(path))
+    print("  通过")
+
+    # 测试6：TaskRunner.sync_state 清理已删除的任务并处理 --reset-ttl
+    print("\n【测试6】sync_state")
+    store = StateStore(path)
+    runner = TaskRunner(logger, store, (("execute", None), ("deleteFile", None), ("download", None)))
+    config = {"execute": {"a": {"TTL": 3}, "b": {"TTL": 3}}, "download": {"a": {"TTL": 3}}}
+    for type_, id_ in (("execute", "a"), ("execute", "b"), ("download", "a"), ("download", "gone")):
+        store.set_counter(type_, id_, 3, 1)
+
+    runner.sync_state(config)
+    assert store.counter("download", "gone", 3) == 3 and store.counter("deleteFile", "y", 2) == 2
+    assert store.counter("execute", "a", 3) == 1
+
+    runner.sync_state(config, ["execute:a"])
+    assert store.counter("execute", "a", 3) == 3 and store.counter("download", "a", 3) == 1
+    runner.sync_state(config, ["a"])
+    assert store.counter("download", "a", 3) == 3 and store.counter("execute", "b", 3) == 1
+    runner.sync_state(config, [])
+    assert store.counter("execute", "b", 3) == 3
+    store.close()
+    print("  通过")
+
+print("\n全部通过")